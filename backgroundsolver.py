@@ -0,0 +1,185 @@
+# Solving Trusses on a Worker Thread
+import atexit
+import queue
+import threading
+import numpy as np
+from truss import trussFromFile
+
+
+class SolveResult(object):
+    """
+    Outcome of a background solve, in the store order of the snapshot it was computed from:
+        tag           - whatever was passed to BackgroundSolver.submit with the snapshot
+        solved        - whether the truss could be solved
+        memberForces  - (M) axial force in each member
+        reactions     - (X, Y) force of each support, in the order of Truss.getSupports()
+        displacements - (J x 2) joint displacements, if the stiffness method was used
+        error         - message of an unexpected exception, if there was one
+    """
+    def __init__(self, tag, solved=False, memberForces=None, reactions=None, displacements=None, error=None):
+        self.tag = tag
+        self.solved = solved
+        self.memberForces = memberForces
+        self.reactions = reactions
+        self.displacements = displacements
+        self.error = error
+
+
+class BackgroundSolver(object):
+    """
+    Solves snapshots of a truss (Truss.getSnapshot(storeOrder=True)) on a daemon thread, so
+    the thread that owns the truss, such as the Tk main loop, never waits for a solve.
+
+    Only the latest snapshot matters. Submitting one replaces any snapshot that has not been
+    started yet, a solve in progress gives up at its next checkpoint once a newer snapshot is
+    waiting, and results of superseded snapshots are dropped. Finished results are collected
+    with getResult(), which never blocks, so they can be polled from the main loop.
+
+    The worker keeps its own copy of the last truss it solved. A snapshot with the same
+    members and supports only moves joints and changes loads on that copy, so its cached
+    factorization is updated rather than rebuilt (see Truss.incremental) while a joint is
+    dragged around.
+    """
+    def __init__(self, stats=None):
+        """
+        Parameters:
+            stats - profiling.AnalysisStats that the worker's copies of the truss record into
+        """
+        self.stats = stats
+        self.condition = threading.Condition()
+        self.pending = None     # (snapshot, tag) waiting to be solved
+        self.busy = False
+        self.results = queue.Queue()
+        self.thread = None
+        self.closed = False
+
+        # The worker's copy of the truss and the snapshot it was last brought up to date with
+        self.truss = None
+        self.snapshot = None
+
+    def submit(self, snapshot, tag=None):
+        """ Queues a snapshot to be solved, replacing any that has not been started """
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("submit() called on a closed BackgroundSolver")
+            self.pending = (snapshot, tag)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="BackgroundSolver", daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+            self.condition.notify()
+
+    def close(self):
+        """ Stops the worker and lets go of its copy of the truss. Called at exit, since
+            factorizations left on a daemon thread are not always torn down cleanly. """
+        with self.condition:
+            self.closed = True
+            self.pending = None
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def isIdle(self):
+        """ True if nothing is waiting or being solved. Check this before getResult: a solver
+            that was idle has already delivered every result. """
+        with self.condition:
+            return self.pending is None and not self.busy
+
+    def isCancelled(self):
+        """ True if the solve in progress has been superseded by a newer snapshot """
+        return self.pending is not None or self.closed
+
+    def getResult(self):
+        """ Returns the newest finished SolveResult, or None if there is none """
+        result = None
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                return result
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    self.truss = None
+                    self.snapshot = None
+                    return
+                snapshot, tag = self.pending
+                self.pending = None
+                self.busy = True
+
+            try:
+                result = self.solve(snapshot, tag)
+            except Exception as error:
+                # The copy may be half updated, start again from the next snapshot
+                self.truss = None
+                result = SolveResult(tag, error=str(error))
+
+            with self.condition:
+                if result is not None and self.pending is None:
+                    self.results.put(result)
+                self.busy = False
+
+    def solve(self, snapshot, tag):
+        """ Solves a snapshot on the worker's copy of the truss. Returns None if cancelled. """
+        self.update(snapshot)
+        truss = self.truss
+        if self.isCancelled():
+            return None
+
+        if not truss.isSolved:
+            if truss.isDeterminate():
+                truss.analyze()
+            elif truss.getSupports():
+                # Redundant members or supports, fall back on the stiffness method
+                truss.analyzeStiffness()
+
+        if not truss.isSolved:
+            return SolveResult(tag)
+
+        reactions = []
+        for joint, angle in truss.getSupports():
+            if angle is None:
+                reactions.append((joint.fixedX, joint.fixedY))
+            else:
+                reactions.append((joint.rollerX, joint.rollerY))
+
+        memberForces = np.array([truss.forces[member] for member in truss.store.memberProxies], dtype=float)
+        displacements = None
+        if truss.stiffnessSolution is not None:
+            displacements = truss.stiffnessSolution.displacements.copy()
+        return SolveResult(tag, True, memberForces, reactions, displacements)
+
+    def update(self, snapshot):
+        """ Brings the worker's copy of the truss up to date with a snapshot """
+        old = self.snapshot
+        self.snapshot = snapshot
+        if self.truss is None or not _sameStructure(old, snapshot):
+            self.truss = trussFromFile(snapshot, incremental=True)
+            if self.stats is not None:
+                self.truss.stats = self.stats
+            return
+
+        truss = self.truss
+        store = truss.store
+        moved = np.flatnonzero(np.any(store.coords != snapshot.coords, axis=1))
+        if len(moved):
+            # The copy is never searched by location, so its spatial indexes are left alone
+            store.coords[moved] = snapshot.coords[moved]
+            for i in moved.tolist():
+                store.jointProxies[i].updateForces()
+            truss.setGeometryChanged(topologyChanged=False)
+
+        for i in np.flatnonzero(np.any(store.loads != snapshot.loads, axis=1)).tolist():
+            truss.setExternalLoad(store.jointProxies[i], *snapshot.loads[i].tolist())
+
+
+def _sameStructure(a, b):
+    """ True if two snapshots have the same joints, members, stiffnesses and supports """
+    return a is not None and len(a.coords) == len(b.coords) and \
+           all(np.array_equal(getattr(a, key), getattr(b, key))
+               for key in ('memberJoints', 'memberEA', 'fixedJoints', 'rollerJoints', 'rollerAngles'))
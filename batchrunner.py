@@ -0,0 +1,196 @@
+# Headless Batch Analysis of Saved Trusses
+import argparse
+import concurrent.futures
+import contextlib
+import fnmatch
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from truss import loadTruss
+
+
+def analyzeFile(fileName, loadCases=None):
+    """
+    Loads and solves one truss saved by Truss.save. Returns a dictionary that can be written
+    as JSON with the file name, its size, whether it is determinate and solved, the force in
+    each member and the support reactions (both keyed by name) and the time taken in seconds.
+    Determinate trusses are solved by the method of joints, with "roller", "fixedX" and
+    "fixedY" reactions. Any other truss is solved by the stiffness method and its reactions
+    are [X, Y] pairs keyed by joint. Trusses that cannot be solved get a 'diagnosis' instead of
+    forces. Errors are reported in the 'error' entry instead of being raised.
+
+    loadCases optionally maps case names to {joint id: [loadX, loadY]}. The truss is then
+    solved once for each case, in place of the loads saved with it, and the forces and
+    reactions of each case are reported under 'cases'.
+    """
+    result = {'file': fileName}
+    startTime = time.perf_counter()
+    try:
+        truss = loadTruss(fileName)
+        result['joints'] = len(truss.getJoints())
+        result['members'] = len(truss.getMembers())
+        result['determinate'] = truss.isDeterminate()
+
+        if loadCases:
+            result['cases'] = analyzeLoadCases(truss, loadCases)
+            result['solved'] = result['cases'] is not None
+        elif truss.isDeterminate():
+            result['solved'] = truss.analyze()
+        else:
+            result['solved'] = bool(truss.getSupports()) and truss.analyzeStiffness()
+
+        if not result['solved']:
+            result.pop('cases', None)
+            result['diagnosis'] = truss.diagnose().summary()
+
+        elif not loadCases:
+            result['forces'] = dict((member.name, float(member.force)) for member in truss.getMembers())
+            if truss.isDeterminate():
+                result['reactions'] = dict((key, float(truss.getForce(key))) for key in ("roller", "fixedX", "fixedY"))
+            else:
+                result['reactions'] = supportReactions(truss, truss.stiffnessSolution)
+
+    except Exception as error:
+        result['solved'] = False
+        result['error'] = "%s: %s" % (type(error).__name__, error)
+
+    result['seconds'] = time.perf_counter() - startTime
+    return result
+
+
+def analyzeLoadCases(truss, loadCases):
+    """
+    Solves a truss for every load case in loadCases (see analyzeFile), factoring its equations
+    only once. Returns {case name: {'forces': ..., 'reactions': ...}}, or None if the truss
+    cannot be solved.
+    """
+    jointsByID = dict((joint.id, joint) for joint in truss.getJoints())
+    cases = {}
+
+    if truss.isDeterminate():
+        for name, loads in loadCases.items():
+            truss.setLoadCase(name, dict((jointsByID[jointID], tuple(load)) for jointID, load in loads.items()))
+        solution = truss.analyzeLoadCases()
+        if solution is None:
+            return None
+
+        for name in solution.names:
+            forces = solution.getCase(name)
+            cases[name] = {'forces': dict((member.name, float(forces[member])) for member in truss.getMembers()),
+                           'reactions': dict((key, float(forces[key])) for key in ("roller", "fixedX", "fixedY"))}
+        return cases
+
+    if not truss.getSupports():
+        return None
+    try:
+        model = truss.getStiffnessModel()
+    except np.linalg.LinAlgError:
+        return None
+
+    for name, loads in loadCases.items():
+        loadArray = np.zeros((truss.store.numJoints, 2))
+        for jointID, load in loads.items():
+            loadArray[jointsByID[jointID].index] = load
+        solution = model.solve(loadArray)
+        cases[name] = {'forces': dict((member.name, float(force)) for member, force in
+                                      zip(truss.store.memberProxies, solution.memberForces)),
+                       'reactions': supportReactions(truss, solution)}
+    return cases
+
+
+def supportReactions(truss, solution):
+    """ Reactions of a stiffness.StiffnessSolution as [X, Y] pairs keyed by joint id """
+    return dict((joint.id, solution.reactions[i].tolist()) for i, (joint, angle) in enumerate(truss.getSupports()))
+
+
+def analyzeFiles(fileNames, loadCases=None):
+    """ Analyzes a chunk of files in one worker process """
+    # Keep any diagnostics printed by the solver out of the results on standard output
+    with contextlib.redirect_stdout(sys.stderr):
+        return [analyzeFile(fileName, loadCases) for fileName in fileNames]
+
+
+def findTrussFiles(paths, pattern="*.truss,*.txt"):
+    """ Expands directories in paths into the files beneath them that match one of the comma
+        separated patterns """
+    patterns = pattern.split(',')
+    fileNames = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, subdirectories, files in os.walk(path):
+                subdirectories.sort()
+                for name in sorted(files):
+                    if any(fnmatch.fnmatch(name, p) for p in patterns):
+                        fileNames.append(os.path.join(directory, name))
+        else:
+            fileNames.append(path)
+
+    return fileNames
+
+
+def runBatch(fileNames, output, workers=None, chunkSize=16, loadCases=None, write=None, ordered=False):
+    """
+    Analyzes every file across a pool of worker processes and writes the result of each file
+    to output (a file object) as soon as its chunk completes, so results stream out in
+    completion order rather than input order unless ordered is True. Files are handed to the
+    workers chunkSize at a time to keep the cost of inter-process communication low. With a
+    single worker the files are analyzed in this process instead.
+
+    Results are written with write(result, output), by default as one JSON line per file.
+    Returns the number of files that were solved.
+    """
+    if write is None:
+        write = writeJSON
+
+    chunks = [fileNames[i:i+chunkSize] for i in range(0, len(fileNames), chunkSize)]
+    numSolved = 0
+
+    if workers == 1:
+        for chunk in chunks:
+            for result in analyzeFiles(chunk, loadCases):
+                write(result, output)
+                numSolved += result['solved']
+            output.flush()
+        return numSolved
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(analyzeFiles, chunk, loadCases) for chunk in chunks]
+        for future in (futures if ordered else concurrent.futures.as_completed(futures)):
+            for result in future.result():
+                write(result, output)
+                numSolved += result['solved']
+            output.flush()
+
+    return numSolved
+
+
+def writeJSON(result, output):
+    output.write(json.dumps(result) + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze saved trusses in parallel and write one JSON line per file.")
+    parser.add_argument('paths', nargs='+', help="truss files or directories containing them")
+    parser.add_argument('-o', '--output', help="file to write results to (default: standard output)")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="number of worker processes (default: one per core)")
+    parser.add_argument('-c', '--chunk-size', type=int, default=16, help="files handed to a worker at a time")
+    parser.add_argument('-p', '--pattern', default="*.truss,*.txt", help="comma separated file name patterns used inside directories")
+    args = parser.parse_args(argv)
+
+    fileNames = findTrussFiles(args.paths, args.pattern)
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        numSolved = runBatch(fileNames, output, args.workers, args.chunk_size)
+    finally:
+        if args.output:
+            output.close()
+
+    sys.stderr.write("Solved %d of %d trusses\n" % (numSolved, len(fileNames)))
+    return 0 if numSolved == len(fileNames) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+# Benchmarks of the Truss Model and Solvers
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import solver
+from truss import Truss, buildTruss, loadTruss
+
+"""
+Times the hot paths of the truss model on generated Pratt trusses of increasing size and
+records the peak memory each one allocates, e.g.
+
+    python benchmarks.py -o before.json
+    python benchmarks.py -o after.json
+    python benchmarks.py --compare before.json after.json
+
+Every benchmark is run a few times and the fastest time is kept. Memory is measured with
+tracemalloc in a separate run, since tracing slows everything down.
+"""
+
+
+def prattTruss(numPanels, panelWidth=20.0, height=30.0, load=-10.0):
+    """
+    Returns a simply supported Pratt truss with numPanels >= 2 panels (4 * numPanels - 3 members),
+    built in one pass with buildTruss. Every interior joint of the bottom chord carries load.
+    """
+    bottom = np.column_stack((np.arange(numPanels + 1) * panelWidth, np.zeros(numPanels + 1)))
+    top = np.column_stack((np.arange(1, numPanels) * panelWidth, np.full(numPanels - 1, height)))
+    coords = np.vstack((bottom, top))
+
+    b = np.arange(numPanels + 1)
+    t = numPanels + 1 + np.arange(numPanels - 1)
+    half = numPanels // 2
+    members = [np.column_stack((b[:-1], b[1:])),                   # bottom chord
+               np.column_stack((t[:-1], t[1:])),                   # top chord
+               np.column_stack((t, b[1:-1])),                      # verticals
+               [(b[0], t[0]), (t[-1], b[-1])]]                     # end posts
+    # Diagonals slope down towards the middle of the span
+    members.append(np.array([(t[i-1], b[i+1]) for i in range(1, half)], dtype=int).reshape(-1, 2))
+    members.append(np.array([(t[i], b[i]) for i in range(half, numPanels - 1)], dtype=int).reshape(-1, 2))
+
+    loads = np.zeros((len(coords), 2))
+    loads[1:numPanels, 1] = load
+    return buildTruss(coords, np.vstack(members), fixedJoints=[0], rollerJoints=[numPanels], loads=loads)
+
+
+""" -------------------------------------------------------------------
+    Benchmarks
+    -------------------------------------------------------------------
+    Each benchmark takes the number of panels of the truss and returns
+    (setup, run). setup() prepares a fresh state and is not timed,
+    run(state) is the operation being measured.
+"""
+def benchBuild(numPanels):
+    """ buildTruss from arrays, as loadTruss does """
+    return (lambda: None), (lambda state: prattTruss(numPanels))
+
+
+def benchAddMember(numPanels):
+    """ Building the same truss one addJoint / addMember call at a time, as the GUI does """
+    def setup():
+        truss = prattTruss(numPanels)
+        coords = [joint.getLoc().tolist() for joint in truss.getJoints()]
+        position = dict((joint, i) for i, joint in enumerate(truss.getJoints()))
+        edges = [(position[member.startJoint], position[member.endJoint]) for member in truss.getMembers()]
+        return coords, edges
+
+    def run(state):
+        coords, edges = state
+        truss = Truss()
+        joints = [truss.addJoint(x, y) for x, y in coords]
+        for start, end in edges:
+            truss.addMember(joints[start], joints[end])
+        return truss
+
+    return setup, run
+
+
+def benchDeleteJoint(numPanels):
+    """ Deleting 100 joints (and their members) from random places """
+    def setup():
+        truss = prattTruss(numPanels)
+        joints = list(truss.getJoints())
+        return truss, random.Random(0).sample(joints, min(100, len(joints)))
+
+    def run(state):
+        truss, joints = state
+        for joint in joints:
+            truss.deleteJoint(joint)
+
+    return setup, run
+
+
+def benchNearby(numPanels):
+    """ 1000 getNearbyJoint and getNearbyMember queries at random points """
+    def setup():
+        truss = prattTruss(numPanels)
+        generator = random.Random(0)
+        points = [(generator.uniform(0, 20.0 * numPanels), generator.uniform(0, 30.0)) for i in range(1000)]
+        return truss, points
+
+    def run(state):
+        truss, points = state
+        for x, y in points:
+            truss.getNearbyJoint(x, y)
+            truss.getNearbyMember(x, y)
+
+    return setup, run
+
+
+def benchAnalyze(numPanels):
+    """ analyze after the geometry changed: rigidity check, assembly, factorization and solve """
+    def setup():
+        truss = prattTruss(numPanels)
+        truss.setGeometryChanged()
+        return truss
+
+    return setup, (lambda truss: truss.analyze())
+
+
+def benchResolve(numPanels):
+    """ analyze after only the loads changed, reusing the factorization """
+    def setup():
+        truss = prattTruss(numPanels)
+        truss.analyze()
+        truss.setUnsolved()
+        return truss
+
+    return setup, (lambda truss: truss.analyze())
+
+
+def benchAnalyzeBanded(numPanels):
+    """ analyze with the banded dense path """
+    def setup():
+        truss = prattTruss(numPanels)
+        truss.setGeometryChanged()
+        return truss
+
+    return setup, (lambda truss: truss.analyze(sparse=False))
+
+
+def benchStiffness(numPanels):
+    """ analyzeStiffness from scratch """
+    def setup():
+        truss = prattTruss(numPanels)
+        truss.setGeometryChanged()
+        return truss
+
+    return setup, (lambda truss: truss.analyzeStiffness())
+
+
+def benchSave(numPanels):
+    """ Truss.save to an uncompressed binary file """
+    def setup():
+        return prattTruss(numPanels), _tempName()
+
+    def run(state):
+        truss, fileName = state
+        truss.save(fileName)
+        os.remove(fileName)
+
+    return setup, run
+
+
+def benchLoad(numPanels):
+    """ loadTruss of a binary file, the model side of App.load """
+    def setup():
+        fileName = _tempName()
+        prattTruss(numPanels).save(fileName)
+        return fileName
+
+    def run(fileName):
+        loadTruss(fileName)
+        os.remove(fileName)
+
+    return setup, run
+
+
+BENCHMARKS = [
+    ('build', benchBuild),
+    ('addMember', benchAddMember),
+    ('deleteJoint', benchDeleteJoint),
+    ('nearby', benchNearby),
+    ('analyze', benchAnalyze),
+    ('resolve', benchResolve),
+    ('analyzeBanded', benchAnalyzeBanded),
+    ('analyzeStiffness', benchStiffness),
+    ('save', benchSave),
+    ('load', benchLoad),
+]
+
+
+def _tempName():
+    handle, fileName = tempfile.mkstemp(suffix='.truss')
+    os.close(handle)
+    return fileName
+
+
+def timeBenchmark(setup, run, repeat=3):
+    """ Returns the fastest of repeat timed runs, in seconds """
+    best = float('inf')
+    for i in range(repeat):
+        state = setup()
+        startTime = time.perf_counter()
+        run(state)
+        best = min(best, time.perf_counter() - startTime)
+    return best
+
+
+def measureMemory(setup, run):
+    """ Returns the peak number of bytes allocated during one run """
+    state = setup()
+    tracemalloc.start()
+    try:
+        run(state)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def runBenchmarks(sizes, names=None, repeat=3, memory=True, log=None):
+    """
+    Runs the benchmarks (all of them unless names are given) on Pratt trusses of each number of
+    panels in sizes. Returns a list of results, one dictionary per benchmark and size.
+    """
+    results = []
+    for numPanels in sizes:
+        numMembers = len(prattTruss(numPanels).getMembers())
+        for name, benchmark in BENCHMARKS:
+            if names and name not in names:
+                continue
+
+            setup, run = benchmark(numPanels)
+            result = {'benchmark': name, 'panels': numPanels, 'members': numMembers,
+                      'seconds': timeBenchmark(setup, run, repeat)}
+            if memory:
+                result['peakBytes'] = measureMemory(setup, run)
+            results.append(result)
+
+            if log:
+                log.write("%-18s %7d members  %10.6f s  %s\n" % (name, numMembers, result['seconds'],
+                          _formatBytes(result.get('peakBytes'))))
+    return results
+
+
+def environment():
+    """ Describes where the benchmarks ran, so results from different machines are not mixed up """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return {'commit': commit, 'python': platform.python_version(), 'numpy': np.__version__,
+            'scipy': solver.HAS_SCIPY and __import__('scipy').__version__ or None,
+            'machine': platform.machine(), 'processor': platform.processor(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def compareResults(baseline, current, output=sys.stdout):
+    """ Prints the ratio of current to baseline times (and peak memory) for each benchmark """
+    base = dict(((result['benchmark'], result['panels']), result) for result in baseline['results'])
+    output.write("%-18s %8s %12s %12s %8s %8s\n" % ("benchmark", "members", "before (s)", "after (s)", "time", "memory"))
+    for result in current['results']:
+        old = base.get((result['benchmark'], result['panels']))
+        if old is None:
+            continue
+        timeRatio = result['seconds'] / old['seconds'] if old['seconds'] else float('nan')
+        memoryRatio = ""
+        if old.get('peakBytes') and result.get('peakBytes') is not None:
+            memoryRatio = "%.2fx" % (result['peakBytes'] / old['peakBytes'])
+        output.write("%-18s %8d %12.6f %12.6f %7.2fx %8s\n" % (result['benchmark'], result['members'], old['seconds'],
+                                                              result['seconds'], timeRatio, memoryRatio))
+
+
+def _formatBytes(numBytes):
+    if numBytes is None:
+        return ""
+    return "%.1f MiB" % (numBytes / 2.0**20)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the truss model and solvers.")
+    parser.add_argument('-s', '--sizes', default="10,100,1000,10000",
+                        help="comma separated numbers of panels, each about 4 members (default: 10,100,1000,10000)")
+    parser.add_argument('-b', '--benchmarks', help="comma separated benchmarks to run (default: all): " +
+                        ", ".join(name for name, benchmark in BENCHMARKS))
+    parser.add_argument('-r', '--repeat', type=int, default=3, help="timed runs of each benchmark, the fastest is kept")
+    parser.add_argument('-o', '--output', help="JSON file to write the results to")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc runs")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help="compare two result files and exit")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as baseline, open(args.compare[1]) as current:
+            compareResults(json.load(baseline), json.load(current))
+        return 0
+
+    names = args.benchmarks.split(',') if args.benchmarks else None
+    unknown = set(names or ()) - set(name for name, benchmark in BENCHMARKS)
+    if unknown:
+        parser.error("unknown benchmarks: " + ", ".join(sorted(unknown)))
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = {'environment': environment(),
+               'results': runBenchmarks(sizes, names, args.repeat, not args.no_memory, log=sys.stderr)}
+
+    if args.output:
+        with open(args.output, 'w') as outputFile:
+            json.dump(results, outputFile, indent=1)
+    else:
+        json.dump(results, sys.stdout, indent=1)
+        sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,12 +18,30 @@ LOAD_SCALE_FACTOR    = 1/4 # Newtons per pixel
 LOAD_LABEL_OFFSET    = 10   # pixels
 MINIMUM_ARROW_LENGTH = 20 # pixels
 
+# Dragging joints and loads solves and redraws the truss at most this often
+DRAG_FRAME_RATE      = 30 # frames per second
+
+# How often the GUI checks whether the background solver has finished
+SOLVER_POLL_INTERVAL = 15 # milliseconds
+
 # Grid Constants
 SMALL_GRID_SPACING   = 10 #pixels
 MED_GRID_SPACING     = 20 #pixels
 LARGE_GRID_SPACING   = 30 #pixels
+MINIMUM_GRID_SPACING = 8 # pixels, the grid is drawn coarser when zoomed out further
 GRID_COLOR           = 'gray85'
 
+# Zoom and Pan, scales are in pixels per truss unit
+ZOOM_STEP            = 1.25
+MIN_ZOOM             = 0.02
+MAX_ZOOM             = 20
+FIT_PADDING          = 40 # pixels
+VIEW_MARGIN          = 50 # pixels, elements this close to the canvas are drawn as well
+
+# Level of detail: when zoomed out below these scales, parts of the drawing are left out
+LABEL_MIN_ZOOM       = 0.5  # force labels, joint labels and load labels
+ARROW_MIN_ZOOM       = 0.25 # arrowheads of loads and reactions
+
 # Colors
 STATUS_TEXT_COLOR   = 'maroon'
 JOINT_COLOR         = 'black'
@@ -43,4 +61,10 @@ TENSION_TEXT_COLOR  = 'blue'
 COMPRESSION_COLOR   = 'red'
 COMPRESSION_TEXT_COLOR = 'red'
 
+# A force that differs from the one on display by less than this is not redrawn
+FORCE_DISPLAY_TOLERANCE = 0.005 # Newtons
+
+INFLUENCE_LINE_COLOR  = 'purple'
+INFLUENCE_LINE_HEIGHT = 60 # pixels for the largest value
+
 INFO_PANE_BG_COLOR  = 'red'
@@ -3,6 +3,8 @@ from constants import *
 from graphics import *
 from helperfunctions import *
 from dialogs import *
+from viewport import Viewport
+import time
 
 
 """ -------------------------------------------------------------------
@@ -28,6 +30,16 @@ from dialogs import *
                 'roller joint'  - Clicking on a joint selects it as a roller joint
                 
                 'add loads'  -  Click and drag from a joint to add a load
+
+                Dragging a joint or a load can generate motion events much
+                faster than a large truss can be solved and redrawn, so they
+                are coalesced: only the latest position is kept and it is
+                applied at most frameRate times per second, or as soon as
+                the mouse button is released.
+
+                The view is zoomed with the mouse wheel and panned by dragging
+                with the middle button, see Viewport. Only the joints, members
+                and loads in view have canvas items.
 """
 ### Could potentially use a dictionary to map item handles to actual classes.
 ### That way, access to the current object would be as simple as
@@ -35,7 +47,7 @@ from dialogs import *
 ### XGraphic class for whatever it is, joint, member, or load!
 
 class DesignSpace():
-    def __init__(self,master,gridSpacing = MED_GRID_SPACING):
+    def __init__(self,master,gridSpacing = MED_GRID_SPACING,frameRate = DRAG_FRAME_RATE):
         self.master = master
         self.canvas = Canvas(master.frame,width=DESIGNSPACE_WIDTH, \
                              height=DESIGNSPACE_HEIGHT, \
@@ -44,10 +56,17 @@ class DesignSpace():
 
         # Objects dictionary key = item handle number, value = graphic class
         self.objects = {}
+
+        # Zoom and pan, the graphics find the view through their canvas
+        self.view = Viewport(DESIGNSPACE_WIDTH,DESIGNSPACE_HEIGHT)
+        self.canvas.view = self.view
+        self.viewJob = None         # Tk callback that will bring the canvas up to date with the view
+        self.isRelayoutPending = False
+        self.panPos = None
         
         # Draw grid lines
         self.gridSpacing = gridSpacing
-        self.drawGrid()
+        self.grid = GridGraphic(self.canvas,gridSpacing)
 
         # Draw status text
         self.statusBar = StatusGraphic(self.canvas,0,DESIGNSPACE_HEIGHT,SW)
@@ -63,6 +82,12 @@ class DesignSpace():
         self.canvas.bind("<ButtonRelease-1>",self.mouseRelease)
         self.canvas.bind("<Motion>", self.mouseMotion)
         self.canvas.bind("<Leave>",self.mouseExit)
+        self.canvas.bind("<Configure>",self.resizeView)
+        self.canvas.bind("<MouseWheel>",self.mouseWheel)
+        self.canvas.bind("<Button-4>",self.mouseWheel)
+        self.canvas.bind("<Button-5>",self.mouseWheel)
+        self.canvas.bind("<Button-2>",self.mouseClickB2)
+        self.canvas.bind("<B2-Motion>",self.mouseMotionB2)
 
 
         # Handles for manipulating joints
@@ -78,6 +103,13 @@ class DesignSpace():
         # Handles for Special Graphics
         self.memberLine = None
         self.jointShadow = None
+        self.influenceLine = None
+
+        # Coalesced drag events, see scheduleDrag
+        self.frameRate = frameRate
+        self.pendingDrag = None     # Latest motion event that has not been applied yet
+        self.dragJob = None         # Tk callback that will apply it
+        self.lastFrame = 0.0
 
         # Right Click Menu
         self.rcJointMenu = self.rightClickMenu("joint")
@@ -85,35 +117,34 @@ class DesignSpace():
         self.rcNothingMenu = self.rightClickMenu("free space")
 
     def eraseGrid(self):
-        self.canvas.delete('grid')
+        self.grid.hide()
 
     def drawGrid(self):
-        # Draw grid lines 
-        for x in range (0,int(self.canvas['width']),self.gridSpacing): 
-            self.canvas.create_line(x,0,x,int(self.canvas['height']),fill=GRID_COLOR,tags='grid') 
-        for y in range(0,int(self.canvas['height']),self.gridSpacing): 
-            self.canvas.create_line(0,y,int(self.canvas['width']),y,fill=GRID_COLOR,tags='grid')
-
-        self.canvas.lower('grid')
+        # Reuses the grid's line items, see GridGraphic
+        self.grid.setSpacing(self.gridSpacing)
 
     def mouseExit(self,event):
         self.canvas.delete(self.jointShadow)
         self.jointShadow = None
 
     def trussCoor(self,cx,cy):
-        return (cx, int(self.canvas['height']) - cy)
+        return self.view.toTruss(cx,cy)
 
     def canvasCoor(self,tx,ty):
-            return (tx, int(self.canvas['height']) - ty)
+            return self.view.toCanvas(tx,ty)
+
+    def eventCoor(self,event):
+        """ Canvas coordinates of a mouse event, snapped to the grid when snapping """
+        if self.isSnapping:
+            return self.view.snap(event.x,event.y,self.gridSpacing)
+        return (event.x,event.y)
 
 
     def addJoint(self,event):
         """ Draw a joint and canvasx and canvasy
         """
-        #print(event.x,event.y, self.canvas.canvasx(event.x),self.canvas.canvasy(event.y)) # for debugging
-        cx = self.canvas.canvasx(event.x,gridspacing=(self.gridSpacing if self.isSnapping else None))
-        cy = self.canvas.canvasy(event.y,gridspacing=(self.gridSpacing if self.isSnapping else None))
-        trussX,trussY = rectifyPos((cx,cy),self.canvas)
+        cx, cy = self.eventCoor(event)
+        trussX,trussY = self.trussCoor(cx,cy)
         newJoint = self.master.truss.addJoint(trussX,trussY)
         newJoint.graphic = JointGraphic(self.canvas,newJoint)
         newJoint.loadLine = None
@@ -136,9 +167,7 @@ class DesignSpace():
         if wasSolved:
             # print("truss was solved")
             self.master.truss.setUnsolved()
-            for member in self.master.truss.getMembers():
-                # print("processing",str(member))
-                member.graphic.update()
+            self.master.updateTrussSolution()
             self.master.solveTruss()
 
         self.mjCount.setText(" ("+str(len(self.master.truss.getJoints()))+" Joints / "+str(len(self.master.truss.getMembers()))+" Members)")
@@ -153,13 +182,22 @@ class DesignSpace():
         if wasSolved:
             # print("truss was solved")
             self.master.truss.setUnsolved()
-            for member in self.master.truss.getMembers():
-                # print("processing",str(member))
-                member.graphic.update()
+            self.master.updateTrussSolution()
             self.master.solveTruss()
 
         self.mjCount.setText(" ("+str(len(self.master.truss.getJoints()))+" Joints / "+str(len(self.master.truss.getMembers()))+" Members)")
 
+    def showInfluenceLine(self):
+        """ Plots the influence line of the current member along the bottom chord """
+        self.hideInfluenceLine()
+        if self.master.truss.isDeterminate():
+            self.influenceLine = InfluenceLineGraphic(self.canvas,self.master.truss,self.currentMember)
+
+    def hideInfluenceLine(self):
+        if self.influenceLine:
+            self.influenceLine.delete()
+            self.influenceLine = None
+
     def deleteCurrentLoad(self):
         self.master.truss.setExternalLoad(self.currentJoint) # Resets the load to (0,0)
         if self.currentJoint.loadLine:
@@ -169,18 +207,21 @@ class DesignSpace():
 
     def mouseMotion(self,event):
         if self.mode == "create":
-            X, Y = self.canvas.canvasx(event.x,gridspacing=(self.gridSpacing if self.isSnapping else None)), self.canvas.canvasy(event.y,gridspacing=(self.gridSpacing if self.isSnapping else None))
+            X, Y = self.eventCoor(event)
             if self.jointShadow:
                 self.canvas.coords(self.jointShadow,(X-JOINT_SIZE/2,Y-JOINT_SIZE/2,X+JOINT_SIZE/2,Y+JOINT_SIZE/2))#,fill='gray75')
             else:
                 self.jointShadow = self.canvas.create_oval(X-JOINT_SIZE/2,Y-JOINT_SIZE/2,X+JOINT_SIZE/2,Y+JOINT_SIZE/2,fill='gray85',outline="")
 
     def mouseClickB1(self,event):
+        # Any click dismisses the influence line, it is not kept up to date with the truss
+        self.hideInfluenceLine()
+
         # These lines are executed for every mouse click, regardless of the mode of the Design Space
         # This is to ensure that self.currentJoint is always the last joint clicked on.
-        trussX,trussY = rectifyPos((event.x,event.y),self.canvas)
-        self.currentJoint = self.master.truss.getNearbyJoint(trussX,trussY,rng=JOINT_SIZE)
-        self.currentMember = self.master.truss.getNearbyMember(trussX,trussY,rng=JOINT_SIZE)
+        trussX,trussY = self.trussCoor(event.x,event.y)
+        self.currentJoint = self.master.truss.getNearbyJoint(trussX,trussY,rng=JOINT_SIZE/self.view.scale)
+        self.currentMember = self.master.truss.getNearbyMember(trussX,trussY,rng=JOINT_SIZE/self.view.scale)
         #print("CURRENT CLICK:",trussX,trussY)
         #print(self.canvas.gettags(CURRENT))
 
@@ -205,9 +246,9 @@ class DesignSpace():
             self.selectRollerJoint()
 
     def mouseClickB3(self,event):
-        trussX,trussY = rectifyPos((event.x,event.y),self.canvas)
-        self.currentJoint = self.master.truss.getNearbyJoint(trussX,trussY,rng=JOINT_SIZE)
-        self.currentMember = self.master.truss.getNearbyMember(trussX,trussY,rng=JOINT_SIZE)
+        trussX,trussY = self.trussCoor(event.x,event.y)
+        self.currentJoint = self.master.truss.getNearbyJoint(trussX,trussY,rng=JOINT_SIZE/self.view.scale)
+        self.currentMember = self.master.truss.getNearbyMember(trussX,trussY,rng=JOINT_SIZE/self.view.scale)
 
         if self.currentJoint:
             self.postRCJointMenu(event)
@@ -234,6 +275,7 @@ class DesignSpace():
                 rcMenu.add_command(label="Move Joint",command=self.enterMoveJointMode)
             if obj == "member":
                 rcMenu.add_command(label="Remove Member",command=self.deleteCurrentMember)
+                rcMenu.add_command(label="Show Influence Line",command=self.showInfluenceLine)
             if obj == "free space":
                 rcMenu.add_command(label="Toggle Snapping",command=self.toggleSnap)
                 gridSubMenu = Menu(rcMenu,tearoff=0)
@@ -255,9 +297,9 @@ class DesignSpace():
 
 
     def mouseMotionB1(self,event):
-        # Moving Joints
-        if self.currentJoint and self.mode == "move joints":
-            self.moveJoint(event)
+        # Moving Joints and Adding Loads, both of which solve the truss again
+        if self.currentJoint and self.mode in ("move joints", "add loads"):
+            self.scheduleDrag(event)
             return
 
         # Adding Members
@@ -267,38 +309,71 @@ class DesignSpace():
 
             self.prevJoint = self.currentJoint
             
-            trussX, trussY = rectifyPos((event.x,event.y),self.canvas)
-            possibleNewJoint = self.master.truss.getNearbyJoint(trussX,trussY,rng=JOINT_SIZE)
+            trussX, trussY = self.trussCoor(event.x,event.y)
+            possibleNewJoint = self.master.truss.getNearbyJoint(trussX,trussY,rng=JOINT_SIZE/self.view.scale)
 
             if possibleNewJoint is not None:
                 self.currentJoint = possibleNewJoint
 
             # Graphics
-            self.canvas.delete(self.memberLine)
             if self.prevJoint:
-                self.memberLine = self.canvas.create_line(self.canvasCoor(self.prevJoint.getX(),self.prevJoint.getY()),(event.x,event.y),fill=MEMBER_ACTIVE_COLOR)
+                startX, startY = self.canvasCoor(self.prevJoint.getX(),self.prevJoint.getY())
+                if self.memberLine:
+                    self.canvas.coords(self.memberLine,startX,startY,event.x,event.y)
+                else:
+                    self.memberLine = self.canvas.create_line((startX,startY),(event.x,event.y),fill=MEMBER_ACTIVE_COLOR)
 
             return
 
-        # Adding Loads
-        if self.currentJoint and self.mode == "add loads":
-            cx = self.canvas.canvasx(event.x,gridspacing=(self.gridSpacing if self.isSnapping else None))
-            cy = self.canvas.canvasy(event.y,gridspacing=(self.gridSpacing if self.isSnapping else None))
-            if self.currentJoint.loadLine:
-                self.currentJoint.loadLine.moveTo(cx,cy)
+    def scheduleDrag(self,event):
+        """ Keeps event as the latest position of the drag and makes sure it is applied once the
+            current frame is over. Events arriving before then replace it.
+        """
+        self.pendingDrag = event
+        if self.dragJob is None:
+            wait = self.lastFrame + 1.0/self.frameRate - time.perf_counter()
+            if wait > 0:
+                self.dragJob = self.canvas.after(int(1000*wait) + 1,self.flushDrag)
             else:
-                self.currentJoint.loadLine = LoadGraphic(self.canvas,self.currentJoint,cx,cy)
-
-            trussDX, trussDY = self.currentJoint.loadLine.getDX(),-self.currentJoint.loadLine.getDY()
-            self.master.truss.setExternalLoad(self.currentJoint, \
-                                              LOAD_SCALE_FACTOR *(trussDX), \
-                                              LOAD_SCALE_FACTOR *(trussDY))
-            self.currentJoint.graphic.update()
-            #print(self.master.truss)
-            self.master.solveTruss()
+                self.dragJob = self.canvas.after_idle(self.flushDrag)
+
+    def flushDrag(self):
+        """ Applies the pending drag event, if any, right away """
+        if self.dragJob is not None:
+            self.canvas.after_cancel(self.dragJob)
+            self.dragJob = None
+
+        event = self.pendingDrag
+        if event is None or not self.currentJoint:
+            return
+        self.pendingDrag = None
+        self.lastFrame = time.perf_counter()
+
+        if self.mode == "move joints":
+            self.moveJoint(event)
+        elif self.mode == "add loads":
+            self.dragLoad(event)
+
+    def dragLoad(self,event):
+        cx, cy = self.eventCoor(event)
+        if self.currentJoint.loadLine:
+            self.currentJoint.loadLine.moveTo(cx,cy)
+        else:
+            self.currentJoint.loadLine = LoadGraphic(self.canvas,self.currentJoint,cx,cy)
+
+        trussDX, trussDY = self.currentJoint.loadLine.getDX(),-self.currentJoint.loadLine.getDY()
+        self.master.truss.setExternalLoad(self.currentJoint, \
+                                          LOAD_SCALE_FACTOR *(trussDX), \
+                                          LOAD_SCALE_FACTOR *(trussDY))
+        self.currentJoint.graphic.update()
+        #print(self.master.truss)
+        self.master.solveTruss()
 
 
     def mouseRelease(self,event):
+        # Apply the last position of a drag before anything else
+        self.flushDrag()
+
         if self.mode == "create":
             self.prevJoint = None
             self.canvas.delete(self.memberLine)
@@ -315,8 +390,9 @@ class DesignSpace():
         newMember = self.master.truss.addMember(self.prevJoint,self.currentJoint)
         if newMember:
             newMember.graphic = MemberGraphic(self.canvas,newMember)
-            newMember.startJoint.graphic.update()
-            newMember.endJoint.graphic.update()
+            for joint in (newMember.startJoint, newMember.endJoint):
+                joint.graphic.update()
+                joint.graphic.lift()
         #print(self.master.truss) #for debugging
             self.master.reanalyzeTruss()
 
@@ -324,14 +400,14 @@ class DesignSpace():
         
                 
     def moveJoint(self,event):
-        cx = self.canvas.canvasx(event.x,gridspacing=(self.gridSpacing if self.isSnapping else None))
-        cy = self.canvas.canvasy(event.y,gridspacing=(self.gridSpacing if self.isSnapping else None))
+        cx, cy = self.eventCoor(event)
         trussX,trussY = self.trussCoor(cx,cy)
         self.master.truss.moveJointTo(self.currentJoint,trussX,trussY)
 
-        # Update attached members first...
+        # Update attached members first, keeping their old forces on display until the new
+        # solution arrives so the labels don't flicker while dragging
         for member in self.currentJoint.getMembers():
-            member.graphic.update()
+            member.graphic.update(redrawForce=False)
 
         # Then update joint so it will be on top layer
         self.currentJoint.graphic.update()
@@ -345,6 +421,7 @@ class DesignSpace():
 
     def clear(self):
         self.canvas.delete('truss')
+        self.view.liveGraphics.clear()
         self.mjCount.setText(" ("+str(len(self.master.truss.getJoints()))+" Joints / "+str(len(self.master.truss.getMembers()))+" Members)")
 
     def selectFixedJoint(self,event=None):
@@ -399,16 +476,102 @@ class DesignSpace():
 
     def smallGrid(self):
         self.gridSpacing = SMALL_GRID_SPACING
-        self.eraseGrid()
         self.drawGrid()
 
     def mediumGrid(self):
         self.gridSpacing = MED_GRID_SPACING
-        self.eraseGrid()
         self.drawGrid()
         
     def largeGrid(self):
         self.gridSpacing = LARGE_GRID_SPACING
-        self.eraseGrid()
         self.drawGrid()
 
+
+    def mouseWheel(self,event):
+        # Button-4 and Button-5 are the wheel on X11, elsewhere it is a MouseWheel event with a delta
+        if event.num == 4 or event.delta > 0:
+            self.zoomView(ZOOM_STEP,event.x,event.y)
+        else:
+            self.zoomView(1/ZOOM_STEP,event.x,event.y)
+
+    def mouseClickB2(self,event):
+        self.panPos = (event.x,event.y)
+
+    def mouseMotionB2(self,event):
+        if self.panPos:
+            self.panView(event.x-self.panPos[0],event.y-self.panPos[1])
+        self.panPos = (event.x,event.y)
+
+    def zoomIn(self,event=None):
+        self.zoomView(ZOOM_STEP,self.view.width/2,self.view.height/2)
+
+    def zoomOut(self,event=None):
+        self.zoomView(1/ZOOM_STEP,self.view.width/2,self.view.height/2)
+
+    def fitView(self,event=None):
+        """ Zooms and pans so that the whole truss is in view """
+        coords = self.master.truss.store.coords
+        if len(coords):
+            (x1,y1),(x2,y2) = coords.min(axis=0),coords.max(axis=0)
+            self.view.fit(x1,y1,x2,y2)
+            self.scheduleViewUpdate(relayout=True)
+
+    def resetView(self,event=None):
+        self.view.reset()
+        self.scheduleViewUpdate(relayout=True)
+
+    def resizeView(self,event):
+        self.view.resize(event.width,event.height)
+        self.scheduleViewUpdate(relayout=True)
+
+    def zoomView(self,factor,cx,cy):
+        if self.view.zoom(factor,cx,cy):
+            self.scheduleViewUpdate(relayout=True)
+
+    def panView(self,dx,dy):
+        """ Moves everything on the canvas by (dx,dy) pixels. The items are moved together right
+            away, what comes into or goes out of view is sorted out by refreshView. """
+        self.view.pan(dx,dy)
+        self.canvas.move('truss',dx,dy)
+        self.scheduleViewUpdate()
+
+    def scheduleViewUpdate(self,relayout=False):
+        """ Makes sure refreshView runs once the events waiting to be handled are, so that a
+            burst of wheel or motion events only updates the canvas once """
+        self.isRelayoutPending = self.isRelayoutPending or relayout
+        if self.viewJob is None:
+            self.viewJob = self.canvas.after_idle(self.refreshView)
+
+    def refreshView(self):
+        """ Brings the canvas items up to date with the view. The graphics of elements that came
+            into view are drawn and those that left it cull themselves. After zooming, everything
+            in view is laid out again as well. """
+        self.viewJob = None
+        relayout = self.isRelayoutPending
+        self.isRelayoutPending = False
+
+        truss = self.master.truss
+        with truss.stats.phase('view'):
+            self.grid.update()
+
+            region = self.view.getRegion(VIEW_MARGIN)
+            inView = [member.graphic for member in truss.getMembersInRegion(*region)]
+            for joint in truss.getJointsInRegion(*region):
+                inView.append(joint.graphic)
+                if joint.loadLine:
+                    inView.append(joint.loadLine)
+
+            live = self.view.liveGraphics
+            if relayout:
+                changed = set(inView) | live
+            else:
+                changed = set(inView) ^ live
+            for graphic in changed:
+                graphic.update()
+
+            # Items created just now are on top, put the joints and loads back above the members
+            self.canvas.tag_raise('joint')
+            self.canvas.tag_raise('load')
+
+            if relayout and self.influenceLine:
+                self.influenceLine.update()
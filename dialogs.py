@@ -1,5 +1,6 @@
 # Truss Solver Dialogs
 from tkinter import *
+from tkinter import messagebox, simpledialog
 
 class RollerJointDialog(simpledialog.Dialog):
     def __init__(self,master):
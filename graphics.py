@@ -4,143 +4,296 @@ from helperfunctions import *
 from tkinter import *
 import numpy as np
 
+# The graphics below create their canvas items once and afterwards move and reconfigure them
+# in place with coords and itemconfigure. Parts that come and go, like force labels and
+# reaction arrows, are hidden rather than deleted. Only delete() removes the items for good.
+#
+# Positions go through the canvas's Viewport (see rectifyCoords). A graphic that is out of view
+# when it is updated deletes its items and draws them again once an update finds it in view, so
+# only what is on the canvas has items. Labels and arrowheads are left out when zoomed out.
+
 class MemberGraphic:
     def __init__(self,canvas,member,color=MEMBER_COLOR):
         self.member = member
         self.canvas = canvas
+        self.view = canvas.view
         self.color = color
-        self.draw()
+        self.image = None
+        self.label = None
 
-    def update(self):
-        self.delete()
-        self.draw()
+        # What the items show at the moment, see showForce
+        self.shownForce = None
+        self.shownColor = None
+        self.shownText = None   # None while the label is hidden
+        self.update()
 
-    def draw(self):
-        if self.member.force:
-            color = TENSION_COLOR if self.member.force > 0 else COMPRESSION_COLOR
+    def update(self,redrawForce=True):
+        """ Moves the items to where the member is. With redrawForce False the force on display
+            is left as it is, e.g. while a dragged joint waits for its new solution. """
+        coords = rectifyCoords(self.member.getCoords(),self.canvas)
+        if not self.view.isVisible(*coords):
+            self.delete()
+        elif self.image is None:
+            self.draw(coords)
         else:
-            color = self.color
-            
-        self.image = self.canvas.create_line(rectifyCoords(self.member.getCoords(),self.canvas),fill=color,smooth=True,width=1,tags=('member','truss'))
+            self.canvas.coords(self.image,coords)
+            if self.label is not None:
+                self.placeLabel()
+            if redrawForce:
+                self.showForce()
+
+    def draw(self,coords):
+        self.image = self.canvas.create_line(coords,fill=self.color,smooth=True,width=1,tags=('member','truss'))
+        self.shownColor = self.color
+        self.view.liveGraphics.add(self)
+        self.showForce()
+
+    def getColor(self):
         if self.member.force:
-            labelCoords = rectifyCoords(self.member.getCoords(),self.canvas)
-            labelX = (labelCoords[0] + labelCoords[2]) / 2
-            labelY = (labelCoords[1] + labelCoords[3]) / 2
-            text = "  " + (str(round(self.member.force,2)))
-
-            # Select an appropriate anchor so the label doesn't end up on top of the member's image
-            if self.member.getDX() == 0:
-                anchor = E
-            else:
-                tan = self.member.getDY() / self.member.getDX()
-                if tan > 0:
-                    anchor = SE
-                else:
-                    anchor = NE
-            
-
-            textcolor = TENSION_TEXT_COLOR if self.member.force > 0 else COMPRESSION_TEXT_COLOR
-                
+            return TENSION_COLOR if self.member.force > 0 else COMPRESSION_COLOR
+        return self.color
+
+    def showForce(self):
+        """
+        Shows the force in the member with its colour and a label next to its middle, hiding the
+        label while the force is unknown. Returns whether any item was touched.
+
+        Only the items whose text or colour would change are reconfigured. A force within
+        FORCE_DISPLAY_TOLERANCE of the one on display, with the same sign, is not redrawn at all,
+        so a new solution only costs as much as the change that can be seen.
+        """
+        if self.image is None:
+            return False
+
+        touched = False
+        if not self.view.showLabels() and self.label is not None:
+            self.canvas.delete(self.label)
+            self.label = None
+            self.shownText = None
+            touched = True
+
+        force = self.member.force or None   # A force of 0 is shown like an unknown one
+        shown = self.shownForce
+        # A label removed while zoomed out has to be drawn again, however little the force moved
+        isLabelMissing = self.label is None and self.view.showLabels()
+        if force is not None and shown is not None and (force > 0) == (shown > 0) and \
+           abs(force - shown) <= FORCE_DISPLAY_TOLERANCE and not isLabelMissing:
+            return touched
+        self.shownForce = force
+
+        color = self.getColor()
+        if color != self.shownColor:
+            self.canvas.itemconfigure(self.image,fill=color)
+            self.shownColor = color
+            touched = True
+
+        if force is None or not self.view.showLabels():
+            if self.shownText is not None:
+                self.canvas.itemconfigure(self.label,state=HIDDEN)
+                self.shownText = None
+                touched = True
+            return touched
+
+        text = "  " + (str(round(force,2)))
+        if text == self.shownText:
+            return touched
+
+        textcolor = TENSION_TEXT_COLOR if force > 0 else COMPRESSION_TEXT_COLOR
+        if self.label is None:
+            labelX, labelY, anchor = self.getLabelPos()
             self.label = self.canvas.create_text((labelX,labelY),text=text,anchor=anchor,tags=('member','truss'),fill=textcolor)
         else:
-            self.label = None
+            self.canvas.itemconfigure(self.label,text=text,fill=textcolor,state=NORMAL)
+        self.shownText = text
+        return True
+
+    def placeLabel(self):
+        labelX, labelY, anchor = self.getLabelPos()
+        self.canvas.coords(self.label,labelX,labelY)
+        self.canvas.itemconfigure(self.label,anchor=anchor)
+
+    def getLabelPos(self):
+        """ Returns (x, y, anchor) for the label, next to the middle of the member. The position
+            is worked out from the view, since panning moves the items without updating them. """
+        coords = rectifyCoords(self.member.getCoords(),self.canvas)
+        labelX = (coords[0] + coords[2]) / 2
+        labelY = (coords[1] + coords[3]) / 2
+
+        # Select an appropriate anchor so the label doesn't end up on top of the member's image
+        dx, dy, length = self.member.getGeometry()
+        if dx == 0:
+            anchor = E
+        elif dy / dx > 0:
+            anchor = SE
+        else:
+            anchor = NE
+        return labelX, labelY, anchor
         
     def delete(self):
-        self.canvas.delete(self.image)
-        self.canvas.delete(self.label)
+        if self.image is not None:
+            self.canvas.delete(self.image)
+            self.canvas.delete(self.label)
+            self.image = None
+            self.label = None
+            self.shownForce = self.shownColor = self.shownText = None
+            self.view.liveGraphics.discard(self)
 
 class JointGraphic:
     def __init__(self,canvas,joint,color=JOINT_COLOR):
         self.joint = joint
         self.canvas = canvas
-        self.canvasHeight = int(canvas['height'])
+        self.view = canvas.view
         self.color = color
         self.forceX = None
         self.forceY = None
         self.forceRoller = None
         self.isLabeled = True # Labeling System isn't perfected yet...
-        self.draw(self.canvas)
+        self.image = None
+        self.label = None
+        self.update()
 
     def update(self):
-        self.delete()
-        self.draw(self.canvas)
+        canvasX, canvasY = rectifyPos(self.joint.getLoc(),self.canvas)
+        if not self.view.isVisible(canvasX,canvasY,canvasX,canvasY):
+            self.cull()
+        elif self.image is None:
+            self.draw(self.canvas)
+            return
+        else:
+            self.canvas.coords(self.image,canvasX-JOINT_SIZE/2,canvasY-JOINT_SIZE/2,canvasX+JOINT_SIZE/2,canvasY+JOINT_SIZE/2)
+            self.canvas.itemconfigure(self.image,fill=self.color)
+            self.updateLabel(canvasX,canvasY)
+
+        # Reaction arrows can reach into view from a joint that is not
+        self.updateReactions()
 
     def draw(self,canvas):
-        canvasX = self.joint.getX()
-        canvasY = int(canvas['height']) - self.joint.getY()
+        canvasX, canvasY = rectifyPos(self.joint.getLoc(),canvas)
         self.image = canvas.create_oval(canvasX-JOINT_SIZE/2,canvasY-JOINT_SIZE/2,canvasX+JOINT_SIZE/2,canvasY+JOINT_SIZE/2,fill=self.color,tags=('joint','truss'))
-
-        if self.isLabeled:
-            lx, ly = self.findBestLabelDir()
-            # print(lx,ly)
+        self.view.liveGraphics.add(self)
+        self.updateLabel(canvasX,canvasY)
+        self.updateReactions()
+
+    def updateLabel(self,canvasX,canvasY):
+        if not (self.isLabeled and self.view.showLabels()):
+            if self.label is not None:
+                self.canvas.delete(self.label)
+                self.label = None
+            return
+
+        lx, ly = self.findBestLabelDir()
+        if self.label is None:
             self.label = self.canvas.create_text((canvasX+lx*20,canvasY+ly*20),text=self.joint.id,tags=('joint','truss'))
         else:
-            self.label = None
+            self.canvas.coords(self.label,canvasX+lx*20,canvasY+ly*20)
 
+    def updateReactions(self):
+        """ Points the reaction arrows of a solved support, hiding them when there are none """
+        x, y = self.joint.getLoc()
         if self.joint.isFixed and (self.joint.fixedX or self.joint.fixedY): #If the truss has been solved for these forces
-            self.forceX = LoadGraphic(canvas,self.joint,self.joint.getX()+self.joint.fixedX/LOAD_SCALE_FACTOR,int(canvas['height'])-self.joint.getY(),color=FIXED_FORCE_COLOR)
-            self.forceY = LoadGraphic(canvas,self.joint,self.joint.getX(),int(canvas['height'])-(self.joint.getY()+self.joint.fixedY/LOAD_SCALE_FACTOR),color=FIXED_FORCE_COLOR)
+            startX, startY = rectifyPos((x,y),self.canvas)
+            endX, endY = rectifyPos((x+self.joint.fixedX/LOAD_SCALE_FACTOR,y+self.joint.fixedY/LOAD_SCALE_FACTOR),self.canvas)
+            if self.forceX:
+                self.forceX.moveTo(endX,startY)
+                self.forceY.moveTo(startX,endY)
+            else:
+                self.forceX = LoadGraphic(self.canvas,self.joint,endX,startY,color=FIXED_FORCE_COLOR)
+                self.forceY = LoadGraphic(self.canvas,self.joint,startX,endY,color=FIXED_FORCE_COLOR)
+        elif self.forceX:
+            self.forceX.hide()
+            self.forceY.hide()
 
         if self.joint.isRoller and self.joint.rollerX:
-            self.forceRoller = LoadGraphic(canvas,self.joint,self.joint.getX()-self.joint.rollerX/LOAD_SCALE_FACTOR,\
-                                           self.canvasHeight-(self.joint.getY()-self.joint.rollerY/LOAD_SCALE_FACTOR),color=ROLLER_FORCE_COLOR,arrow=FIRST)
+            endX, endY = rectifyPos((x-self.joint.rollerX/LOAD_SCALE_FACTOR,y-self.joint.rollerY/LOAD_SCALE_FACTOR),self.canvas)
+            if self.forceRoller:
+                self.forceRoller.moveTo(endX,endY)
+            else:
+                self.forceRoller = LoadGraphic(self.canvas,self.joint,endX,endY,color=ROLLER_FORCE_COLOR,arrow=FIRST)
+        elif self.forceRoller:
+            self.forceRoller.hide()
+
+    def lift(self):
+        """ Brings the joint back above members drawn after it """
+        if self.image is not None:
+            self.canvas.tag_raise(self.image)
+        if self.label is not None:
+            self.canvas.tag_raise(self.label)
+
+    def cull(self):
+        """ Deletes the joint's own items, leaving its reaction arrows to cull themselves """
+        if self.image is not None:
+            self.canvas.delete(self.image)
+            self.canvas.delete(self.label)
+            self.image = None
+            self.label = None
+            self.view.liveGraphics.discard(self)
+
     def delete(self):
-        self.canvas.delete(self.image)
-        self.canvas.delete(self.label)
+        self.cull()
         if self.forceX:
             self.forceX.delete()
             self.forceY.delete()
+            self.forceX = self.forceY = None
         if self.forceRoller:
             self.forceRoller.delete()
+            self.forceRoller = None
 
 
     def changeColor(self,newColor):
         self.color = newColor
-        self.update()
+        if self.image is not None:
+            self.canvas.itemconfigure(self.image,fill=newColor)
 
     def findBestLabelDir(self):
+        forcesX = self.joint.forcesX
+        forcesY = self.joint.forcesY
+
         x = 0.0
-        for fx in self.joint.forcesX:
+        for fx in forcesX:
             if fx != 'constant':
-                x -= self.joint.forcesX[fx]
+                x -= forcesX[fx]
                 
-        if self.joint.forcesX['constant'] != 0:
+        if forcesX['constant'] != 0:
             # print("counting external")
-            x -= self.joint.forcesX['constant']/np.sqrt(self.joint.forcesX['constant']**2+self.joint.forcesY['constant']**2)
-            x /= len(self.joint.forcesX)
+            x -= forcesX['constant']/np.sqrt(forcesX['constant']**2+forcesY['constant']**2)
+            x /= len(forcesX)
         else:
-            x /= max((len(self.joint.forcesX)-1),1)
+            x /= max((len(forcesX)-1),1)
 
         y = 0.0
-        for fy in self.joint.forcesY:
+        for fy in forcesY:
             if fy != 'constant':
-                y += self.joint.forcesY[fy]
+                y += forcesY[fy]
                 
-        if self.joint.forcesY['constant'] != 0:
-            y += self.joint.forcesY['constant']/np.sqrt(self.joint.forcesX['constant']**2+self.joint.forcesY['constant']**2)
-            y /= len(self.joint.forcesY)
+        if forcesY['constant'] != 0:
+            y += forcesY['constant']/np.sqrt(forcesX['constant']**2+forcesY['constant']**2)
+            y /= len(forcesY)
         else:
-            y /= max((len(self.joint.forcesY)-1),1)
+            y /= max((len(forcesY)-1),1)
 
-        if not x and not y:
+        if (not x and not y) or not np.isfinite(x + y):
+            # No members to point away from, or one of them has no length
             x, y = (0,-1) # Label should go right above the image
         #print(x,y)
         return (x/np.sqrt(x**2+y**2),y/np.sqrt(x**2+y**2))
     
 class LoadGraphic:
     def __init__(self,canvas,joint,endX,endY,color=LOAD_ACTIVE_COLOR,arrow=LAST):
+        """ Draws an arrow from the joint to the canvas point (endX,endY). Its length stays in
+            truss units, so it grows and shrinks with the zoom like the rest of the truss. """
         self.canvas = canvas
+        self.view = canvas.view
         self.joint = joint
-        startX, startY = rectifyPos(self.joint.getLoc(),self.canvas)
-        self.dx = endX - startX   
-        self.dy = endY - startY
         self.color = color
         self.arrow = arrow
-        #self.image = None
-        self.draw()
+        self.image = None
+        self.label = None
+        self.shown = None       # What the items show at the moment, see reconfigure
+        self.shownLabel = None
+        self.moveTo(endX,endY)
 
     def update(self):
-        self.delete()
+        """ Redraws the arrow from the joint's current location, hiding it if it has no length """
         self.draw()
 
     def draw(self):
@@ -148,42 +301,216 @@ class LoadGraphic:
         magnitudeForce = round(LOAD_SCALE_FACTOR * length,2)
 
         if length != 0:
-            if length < MINIMUM_ARROW_LENGTH:
+            scale = self.view.scale
+            if length*scale < MINIMUM_ARROW_LENGTH:
                     dx = (self.dx/length)*MINIMUM_ARROW_LENGTH
                     dy = (self.dy/length)*MINIMUM_ARROW_LENGTH
             else:
-                    dx = self.dx
-                    dy = self.dy
+                    dx = self.dx*scale
+                    dy = self.dy*scale
 
             startX, startY = rectifyPos(self.joint.getLoc(),self.canvas)
-            textX, textY = startX+dx+(LOAD_LABEL_OFFSET+10*abs(self.dx/length))*(self.dx/length),startY+dy+(LOAD_LABEL_OFFSET+5*abs(self.dy/length))*(self.dy/length)
-                
-            self.image = self.canvas.create_line(rectifyPos(self.joint.getLoc(),self.canvas),(startX+dx,startY+dy),fill=self.color,arrow=self.arrow,tags=('load','truss'))
+            if not self.view.isVisible(startX,startY,startX+dx,startY+dy):
+                self.delete()
+                return
 
-            self.label = self.canvas.create_text((textX,textY),text=str(magnitudeForce)+' N',tags=('load','truss'))
+            textX, textY = startX+dx+(LOAD_LABEL_OFFSET+10*abs(self.dx/length))*(self.dx/length),startY+dy+(LOAD_LABEL_OFFSET+5*abs(self.dy/length))*(self.dy/length)
+            text = str(magnitudeForce)+' N'
+            arrow = self.arrow if self.view.showArrows() else NONE
+
+            # Only what would look different is sent to the canvas, see MemberGraphic.showForce
+            coords = (startX,startY,startX+dx,startY+dy)
+            if self.image is None:
+                self.image = self.canvas.create_line(coords,fill=self.color,arrow=arrow,tags=('load','truss'))
+                self.view.liveGraphics.add(self)
+                self.shown = {'coords': _toPixels(coords), 'version': self.view.version, 'fill': self.color, 'arrow': arrow, 'state': NORMAL}
+            else:
+                self.reconfigure(self.image,self.shown,coords,fill=self.color,arrow=arrow,state=NORMAL)
+
+            if not self.view.showLabels():
+                if self.label is not None:
+                    self.canvas.delete(self.label)
+                    self.label = None
+            elif self.label is None:
+                self.label = self.canvas.create_text((textX,textY),text=text,tags=('load','truss'))
+                self.shownLabel = {'coords': _toPixels((textX,textY)), 'version': self.view.version, 'text': text, 'state': NORMAL}
+            else:
+                self.reconfigure(self.label,self.shownLabel,(textX,textY),text=text,state=NORMAL)
 
         else:
-            self.image = None
-            self.label = None
+            self.hide()
+
+    def reconfigure(self,item,shown,coords,**options):
+        """ Moves and configures an item, skipping whatever is already shown. shown holds the
+            item's coords, rounded to pixels, as of a version of the view (panning moves items
+            behind the graphics' backs), and its options as they are on the canvas. """
+        pixels = _toPixels(coords)
+        if pixels != shown['coords'] or self.view.version != shown['version']:
+            self.canvas.coords(item,coords)
+            shown['coords'] = pixels
+            shown['version'] = self.view.version
+
+        changed = dict((key,value) for key,value in options.items() if shown.get(key) != value)
+        if changed:
+            self.canvas.itemconfigure(item,**changed)
+            shown.update(changed)
+
+    def hide(self):
+        if self.image is not None and self.shown['state'] != HIDDEN:
+            self.canvas.itemconfigure(self.image,state=HIDDEN)
+            self.shown['state'] = HIDDEN
+        if self.label is not None and self.shownLabel['state'] != HIDDEN:
+            self.canvas.itemconfigure(self.label,state=HIDDEN)
+            self.shownLabel['state'] = HIDDEN
 
     def delete(self):
-        self.canvas.delete(self.image)
-        self.canvas.delete(self.label)
+        if self.image is not None:
+            self.canvas.delete(self.image)
+            self.canvas.delete(self.label)
+            self.image = None
+            self.label = None
+            self.view.liveGraphics.discard(self)
 
     def moveTo(self,newX,newY):
-        startX, startY = rectifyPos(self.joint.getLoc(),self.canvas)        
-        self.dx,self.dy = newX - startX, newY - startY
+        """ Points the arrow at the canvas point (newX,newY) """
+        startX, startY = rectifyPos(self.joint.getLoc(),self.canvas)
+        self.dx,self.dy = (newX - startX)/self.view.scale, (newY - startY)/self.view.scale
         self.update()
 
     def getDX(self):
+        """ Length of the arrow along the canvas x axis, in truss units """
         return self.dx
 
     def getDY(self):
+        """ Length of the arrow along the canvas y axis, pointing down, in truss units """
         return self.dy
 
     def makeInactive(self):
         self.color = LOAD_COLOR
-        self.update()
+        if self.image is not None:
+            self.canvas.itemconfigure(self.image,fill=self.color)
+            self.shown['fill'] = self.color
+
+
+def _toPixels(coords):
+    """ Rounds canvas coordinates to whole pixels, to tell whether a move would show """
+    return tuple(int(round(value)) for value in coords)
+
+
+class InfluenceLineGraphic:
+    def __init__(self,canvas,truss,key,color=INFLUENCE_LINE_COLOR):
+        """
+        Plots the influence line of a member (or reaction) of the truss along its bottom chord.
+        The value at each chord joint is drawn above the joint for tension and below it for
+        compression, scaled so that the largest value is INFLUENCE_LINE_HEIGHT pixels.
+        """
+        self.canvas = canvas
+        self.truss = truss
+        self.key = key
+        self.color = color
+        self.image = None
+        self.label = None
+        self.draw()
+
+    def update(self):
+        self.delete()
+        self.draw()
+
+    def draw(self):
+        joints, values = self.truss.getInfluenceLine(self.key)
+        if values is None or len(joints) < 2:
+            return
+
+        largest = np.abs(values).max()
+        scale = INFLUENCE_LINE_HEIGHT / largest if largest else 0.0
+        points = []
+        for joint, value in zip(joints, values):
+            cx, cy = rectifyPos((joint.getX(),joint.getY()),self.canvas)
+            points.extend((cx, cy - value*scale))
+
+        self.image = self.canvas.create_line(points,fill=self.color,width=2,tags=('influence','truss'))
+
+        peak = int(np.abs(values).argmax())
+        self.label = self.canvas.create_text((points[2*peak],points[2*peak+1]),text="  "+str(round(values[peak],2)),\
+                                             anchor=SW,fill=self.color,tags=('influence','truss'))
+
+    def delete(self):
+        self.canvas.delete(self.image)
+        self.canvas.delete(self.label)
+
+
+class GridGraphic:
+    def __init__(self,canvas,spacing,color=GRID_COLOR):
+        """
+        Grid lines over the part of the canvas that is in view. The line items are pooled:
+        changing the spacing or the view moves them with coords, and lines that are not
+        needed are hidden, so the pool only grows to the most lines ever in view at once.
+
+        The spacing is in view coordinates (see Viewport). When zoomed out so far that lines
+        would be closer than MINIMUM_GRID_SPACING pixels, only every second, fourth, ... line
+        is drawn.
+        """
+        self.canvas = canvas
+        self.view = canvas.view
+        self.spacing = spacing
+        self.color = color
+        self.isVisible = True
+        self.lines = []         # Pooled line items
+        self.numShown = 0       # The first numShown lines of the pool are in use
+        self.draw()
+
+    def update(self):
+        self.draw()
+
+    def draw(self):
+        if not self.isVisible:
+            self.showLines(0)
+            return
+
+        view = self.view
+        spacing = self.spacing
+        while spacing*view.scale < MINIMUM_GRID_SPACING:
+            spacing *= 2
+
+        left,top,right,bottom = view.getViewRegion()
+        xs = (np.arange(np.ceil(left/spacing),np.floor(right/spacing)+1)*spacing - left)*view.scale
+        ys = (np.arange(np.ceil(top/spacing),np.floor(bottom/spacing)+1)*spacing - top)*view.scale
+        coords = [(x,0,x,view.height) for x in xs.tolist()] + [(0,y,view.width,y) for y in ys.tolist()]
+
+        created = False
+        while len(self.lines) < len(coords):
+            # Grid lines are disabled so that they never become the CURRENT item
+            self.lines.append(self.canvas.create_line(0,0,0,0,fill=self.color,state=HIDDEN,tags='grid'))
+            created = True
+        if created:
+            self.canvas.lower('grid')
+
+        for line,xy in zip(self.lines,coords):
+            self.canvas.coords(line,xy)
+        self.showLines(len(coords))
+
+    def showLines(self,count):
+        """ Shows the first count lines of the pool and hides the rest """
+        for line in self.lines[self.numShown:count]:
+            self.canvas.itemconfigure(line,state=DISABLED)
+        for line in self.lines[count:self.numShown]:
+            self.canvas.itemconfigure(line,state=HIDDEN)
+        self.numShown = count
+
+    def setSpacing(self,spacing):
+        self.spacing = spacing
+        self.isVisible = True
+        self.draw()
+
+    def hide(self):
+        self.isVisible = False
+        self.draw()
+
+    def delete(self):
+        for line in self.lines:
+            self.canvas.delete(line)
+        self.lines = []
+        self.numShown = 0
 
 
 class StatusGraphic:
@@ -197,22 +524,27 @@ class StatusGraphic:
         self.draw(self.canvas)
 
     def update(self):
-        self.delete()
-        self.draw(self.canvas)
+        if self.image is None:
+            self.draw(self.canvas)
+        else:
+            self.canvas.itemconfigure(self.image,text=self.text,fill=self.color)
 
     def draw(self,canvas):
         self.image = canvas.create_text(self.pos,text=self.text,anchor=self.anchor,fill=self.color,tags="status")
 
     def delete(self):
         self.canvas.delete(self.image)
+        self.image = None
 
     def setText(self,newText):
         self.text = newText
         self.update()
 
     def setTempText(self,tempText):
-        self.delete()
-        self.image = self.canvas.create_text(self.pos,text=tempText,anchor=self.anchor,fill=self.color,tags="status")
+        """ Shows tempText until the next update() """
+        if self.image is None:
+            self.draw(self.canvas)
+        self.canvas.itemconfigure(self.image,text=tempText)
 
 
     def changeColor(self,newColor):
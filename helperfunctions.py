@@ -5,14 +5,14 @@
     rectifyCoords
     -------------------------------------------------------------
     coords - a 4-tuple two point coordinates of the form (x1,y1,x2,y2)
-    canvas - a Tkinter Canvas widget on which these coordinates are
+    canvas - the DesignSpace's Canvas widget, with its Viewport as canvas.view
 
-    Returns the coordinates with the Y-axis inverted based on the canvas
-    height. This is useful for converting between truss and canvas coords.
+    Returns the canvas coordinates of two truss points. The Y-axis is
+    inverted and the points are zoomed and panned with the current view.
 """        
 def rectifyCoords(coords,canvas):
-    canvasHeight = int(canvas['height'])
-    return coords[0],canvasHeight-coords[1],coords[2],canvasHeight-coords[3]
+    view = canvas.view
+    return view.toCanvas(coords[0],coords[1]) + view.toCanvas(coords[2],coords[3])
 
 
 """ --------------------------------------------------------------------
@@ -21,4 +21,4 @@ def rectifyCoords(coords,canvas):
     Same as rectifyCoords except takes a 2-tuple, (x, y)
 """
 def rectifyPos(pos,canvas):
-    return pos[0],int(canvas['height'])-pos[1]
+    return canvas.view.toCanvas(pos[0],pos[1])
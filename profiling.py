@@ -0,0 +1,142 @@
+# Timers and Counters for the Analysis Pipeline
+import logging
+import time
+
+logger = logging.getLogger("truss.stats")
+
+
+class AnalysisStats(object):
+    """
+    Opt-in instrumentation of a truss: the time spent in each phase of an analysis, counters of
+    solves and cache hits, and the latest value of measurements such as the size of the
+    equations. Every Truss has one in self.stats, disabled until enable() is called. While
+    disabled, phase() hands back a shared do-nothing context and count() and record() return
+    straight away, so the instrumented code costs a method call per phase.
+
+        truss.stats.enable()
+        truss.analyze()
+        print(truss.stats)
+        truss.stats.summary()['phases']['factor']['seconds']
+
+    With log=True every phase and measurement is also logged to the "truss.stats" logger at
+    DEBUG level as a line of key=value pairs, e.g.
+
+        event=phase name=factor seconds=0.000412 truss=Bridge
+
+    and the same fields are attached to the log record as record.stats for handlers that
+    write structured output.
+    """
+    def __init__(self, name=""):
+        self.name = name
+        self.enabled = False
+        self.log = False
+        self.reset()
+
+    def enable(self, log=False):
+        self.enabled = True
+        self.log = log
+
+    def disable(self):
+        self.enabled = False
+        self.log = False
+
+    def reset(self):
+        """ Forgets everything measured so far """
+        # Phase name -> [calls, total seconds, seconds of the last call]
+        self.phases = {}
+        self.counters = {}
+        self.values = {}
+
+    def phase(self, name):
+        """ Returns a context manager that times the code run inside it as the phase name """
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+            if self.log:
+                self._log(event='count', name=name, n=n)
+
+    def record(self, name, value):
+        """ Keeps the latest value of a measurement, such as the number of equations """
+        if self.enabled:
+            self.values[name] = value
+            if self.log:
+                self._log(event='value', name=name, value=value)
+
+    def addTime(self, name, seconds):
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = [0, 0.0, 0.0]
+        phase[0] += 1
+        phase[1] += seconds
+        phase[2] = seconds
+        if self.log:
+            self._log(event='phase', name=name, seconds=seconds)
+
+    def getTime(self, name):
+        """ Returns the total seconds spent in a phase """
+        return self.phases.get(name, (0, 0.0, 0.0))[1]
+
+    def getCount(self, name):
+        return self.counters.get(name, 0)
+
+    def getValue(self, name, default=None):
+        return self.values.get(name, default)
+
+    def summary(self):
+        """ Returns everything measured as a dictionary of plain values, ready for JSON """
+        return {'phases': dict((name, {'calls': calls, 'seconds': total, 'last': last})
+                               for name, (calls, total, last) in self.phases.items()),
+                'counters': dict(self.counters),
+                'values': dict(self.values)}
+
+    def _log(self, **fields):
+        if self.name:
+            fields['truss'] = self.name
+        if logger.isEnabledFor(logging.DEBUG):
+            message = " ".join("%s=%s" % (key, _format(value)) for key, value in fields.items())
+            logger.debug(message, extra={'stats': fields})
+
+    def __str__(self):
+        lines = []
+        for name, (calls, total, last) in self.phases.items():
+            lines.append("%-24s %6d calls %12.6f s" % (name, calls, total))
+        for name, value in self.counters.items():
+            lines.append("%-24s %6d" % (name, value))
+        for name, value in self.values.items():
+            lines.append("%-24s %s" % (name, _format(value)))
+        return "\n".join(lines)
+
+
+class _Phase(object):
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.startTime = time.perf_counter()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.stats.addTime(self.name, time.perf_counter() - self.startTime)
+        return False
+
+
+class _NullPhase(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def _format(value):
+    if isinstance(value, float):
+        return "%.6g" % value
+    return str(value)
@@ -0,0 +1,38 @@
+# Registry of Joints and Members
+class Registry(object):
+    """
+    Insertion ordered collection of joints or members keyed by their stable integer uid.
+    Membership tests, lookups by uid, additions and removals are all O(1). It can be iterated
+    and indexed by position like the lists it replaces; positional indexing builds a list the
+    first time it is used after a change.
+    """
+    def __init__(self):
+        self.items = {}
+        self.cachedList = None
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items.values())
+
+    def __contains__(self, item):
+        return self.items.get(getattr(item, 'uid', None)) is item
+
+    def __getitem__(self, position):
+        if self.cachedList is None:
+            self.cachedList = list(self.items.values())
+        return self.cachedList[position]
+
+    def add(self, item):
+        self.items[item.uid] = item
+        self.cachedList = None
+
+    def remove(self, item):
+        if item in self:
+            del self.items[item.uid]
+            self.cachedList = None
+
+    def get(self, uid):
+        """ Returns the item with the given uid, or None """
+        return self.items.get(uid)
@@ -0,0 +1,246 @@
+# Combinatorial Rigidity of Trusses
+import numpy as np
+
+class PebbleGame(object):
+    """
+    The (2,3) pebble game of Jacobs and Hendrickson. Every vertex starts with two pebbles and an
+    edge is accepted as independent if four pebbles can be gathered on its endpoints, in which
+    case one of them is used to cover it. By Laman's theorem a planar graph is generically rigid
+    exactly when it has 2V - 3 independent edges. Each edge costs at most a few searches over
+    the directed graph of covered edges, so the whole game is at worst quadratic.
+    """
+    def __init__(self, numVertices):
+        self.pebbles = [2] * numVertices
+        # out[u] holds the vertices w such that the edge uw is covered by one of u's pebbles
+        self.out = [set() for i in range(numVertices)]
+
+    def addEdge(self, u, v):
+        """ Returns True and covers the edge if it is independent, otherwise returns False """
+        while self.pebbles[u] < 2 and self.findPebble(u, (u, v)):
+            pass
+        while self.pebbles[v] < 2 and self.findPebble(v, (u, v)):
+            pass
+
+        if self.pebbles[u] + self.pebbles[v] < 4:
+            return False
+
+        self.pebbles[u] -= 1
+        self.out[u].add(v)
+        return True
+
+    def findPebble(self, start, locked):
+        """
+        Searches the covered edges for a free pebble reachable from start without visiting the
+        locked vertices, and moves it to start by reversing the edges along the way.
+        """
+        parent = {start: None}
+        for vertex in locked:
+            parent.setdefault(vertex, None)
+
+        stack = [start]
+        while stack:
+            vertex = stack.pop()
+            for neighbor in self.out[vertex]:
+                if neighbor in parent:
+                    continue
+                parent[neighbor] = vertex
+                if self.pebbles[neighbor]:
+                    self.pebbles[neighbor] -= 1
+                    self.pebbles[start] += 1
+                    while neighbor != start:
+                        previous = parent[neighbor]
+                        self.out[previous].discard(neighbor)
+                        self.out[neighbor].add(previous)
+                        neighbor = previous
+                    return True
+                stack.append(neighbor)
+
+        return False
+
+    def searchPebble(self, start, blocked):
+        """
+        Looks for a free pebble reachable from start without visiting the blocked vertices or
+        touching any pebbles. Returns (True, path) with the vertices on the way to the pebble if
+        one is found, otherwise (False, visited) with every vertex the search went through; none
+        of them can reach a free pebble either.
+        """
+        parent = {start: None}
+        stack = [start]
+        while stack:
+            vertex = stack.pop()
+            if self.pebbles[vertex]:
+                path = []
+                while vertex is not None:
+                    path.append(vertex)
+                    vertex = parent[vertex]
+                return True, path
+
+            for neighbor in self.out[vertex]:
+                if neighbor not in parent and neighbor not in blocked:
+                    parent[neighbor] = vertex
+                    stack.append(neighbor)
+
+        return False, list(parent)
+
+
+class RigidityDiagnosis(object):
+    """
+    Result of Truss.diagnose. Describes whether the members and supports of a truss can carry
+    loads before any equations are solved.
+        isRigid            - the members alone form a rigid body (2J - 3 independent members)
+        supportsValid      - the reactions of the supports stop every rigid body motion
+        jointMethodSupports - there is exactly one fixed joint and one roller, the only
+                             supports the method of joints (Truss.analyze) solves for
+        redundantMembers   - members that add no stiffness to those considered before them
+        mechanisms         - number of independent internal motions left in the truss
+        components         - rigid components as lists of members, largest first
+        underbracedJoints  - joints outside the largest rigid component
+        isSingular         - the geometry is degenerate even though the structure looks fine
+                             (e.g. collinear members), found when solving
+    """
+    def __init__(self, isRigid, supportsValid, redundantMembers, mechanisms, components, underbracedJoints,
+                 jointMethodSupports=True):
+        self.isRigid = isRigid
+        self.supportsValid = supportsValid
+        self.jointMethodSupports = jointMethodSupports
+        self.redundantMembers = redundantMembers
+        self.mechanisms = mechanisms
+        self.components = components
+        self.underbracedJoints = underbracedJoints
+        self.isSingular = False
+
+    def isStable(self):
+        return self.isRigid and self.supportsValid and not self.isSingular
+
+    def summary(self):
+        if self.isStable() and not self.jointMethodSupports:
+            return "Stable, but the method of joints needs exactly one fixed joint and one roller"
+        if self.isStable():
+            return "Stable"
+
+        problems = []
+        if not self.isRigid:
+            problems.append("%d mechanism(s), under-braced joints: %s" % \
+                            (self.mechanisms, ", ".join(joint.id for joint in self.underbracedJoints)))
+        if self.redundantMembers:
+            problems.append("redundant members: %s" % ", ".join(member.name for member in self.redundantMembers))
+        if not self.supportsValid:
+            problems.append("supports do not restrain the truss")
+        if self.isSingular:
+            problems.append("equations are singular for this geometry")
+        return "Unstable: " + "; ".join(problems)
+
+    def __str__(self):
+        return self.summary()
+
+
+def diagnose(truss):
+    """ Runs the pebble game over the members of truss and checks its supports """
+    joints = list(truss.getJoints())
+    members = list(truss.getMembers())
+    position = dict((joint, i) for i, joint in enumerate(joints))
+
+    game = PebbleGame(len(joints))
+    independent = []
+    redundant = []
+    for member in members:
+        if game.addEdge(position[member.startJoint], position[member.endJoint]):
+            independent.append(member)
+        else:
+            redundant.append(member)
+
+    mechanisms = max(2*len(joints) - 3 - len(independent), 0)
+    components = findComponents(game, independent, position)
+
+    rigidJoints = set()
+    if components:
+        for member in components[0]:
+            rigidJoints.update((member.startJoint, member.endJoint))
+    underbraced = [joint for joint in joints if joint not in rigidJoints]
+    if len(joints) < 2:
+        underbraced = []
+
+    return RigidityDiagnosis(len(joints) >= 2 and mechanisms == 0, supportsRestrain(truss),
+                             redundant, mechanisms, components, underbraced, hasJointMethodSupports(truss))
+
+
+def findComponents(game, independent, position):
+    """
+    Splits the independent members into rigid components. With three pebbles pinned on the
+    endpoints of a member, the joints that cannot get a free pebble are rigidly attached to it.
+    """
+    neighbors = {}
+    for member in independent:
+        u, v = position[member.startJoint], position[member.endJoint]
+        neighbors.setdefault(u, []).append((v, member))
+        neighbors.setdefault(v, []).append((u, member))
+
+    assigned = set()
+    components = []
+    for member in independent:
+        if member in assigned:
+            continue
+
+        u, v = position[member.startJoint], position[member.endJoint]
+        while game.pebbles[u] < 2 and game.findPebble(u, (u, v)):
+            pass
+        while game.pebbles[u] + game.pebbles[v] < 3 and game.findPebble(v, (u, v)):
+            pass
+
+        # Every vertex that cannot get a pebble is rigidly attached to the member. A failed search
+        # proves that for all the vertices it visited, and a successful one proves the opposite
+        # for the vertices on its path, so neither is searched from again.
+        rigid = set((u, v))
+        free = set()
+        stack = [u, v]
+        while stack:
+            vertex = stack.pop()
+            for neighbor, edge in neighbors[vertex]:
+                if neighbor in rigid or neighbor in free:
+                    continue
+                found, visited = game.searchPebble(neighbor, rigid)
+                if found:
+                    free.update(visited)
+                else:
+                    rigid.update(visited)
+                    stack.extend(visited)
+
+        component = []
+        for vertex in rigid:
+            for neighbor, edge in neighbors[vertex]:
+                if neighbor in rigid and edge not in assigned:
+                    assigned.add(edge)
+                    component.append(edge)
+        components.append(component)
+
+    components.sort(key=len, reverse=True)
+    return components
+
+
+def supportsRestrain(truss):
+    """ Returns whether the supports of the truss together stop all rigid body motion of it """
+    supports = truss.getSupports()
+    if not supports:
+        return False
+
+    # Each reaction is a force along (c, s) through its joint, which resists the motions with
+    # row (c, s, moment) where the moment is taken about the first support. The supports only
+    # stop every motion if these rows span all three.
+    x0, y0 = supports[0][0].getX(), supports[0][0].getY()
+    rows = []
+    for joint, angle in supports:
+        rx, ry = joint.getX() - x0, joint.getY() - y0
+        directions = [(1.0, 0.0), (0.0, 1.0)] if angle is None else \
+                     [(np.cos(np.radians(angle)), np.sin(np.radians(angle)))]
+        rows.extend((c, s, rx*s - ry*c) for c, s in directions)
+
+    rows = np.array(rows)
+    size = max(np.abs(rows[:,2]).max(), 1.0)
+    rows[:,2] /= size
+    return len(rows) >= 3 and np.linalg.matrix_rank(rows, tol=1e-9) == 3
+
+
+def hasJointMethodSupports(truss):
+    """ Returns whether the truss has the supports the method of joints solves for: exactly one
+        fixed joint and one roller """
+    return len(truss.fixedJoints) == 1 and len(truss.rollerJoints) == 1
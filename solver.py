@@ -0,0 +1,379 @@
+# Linear Solvers for Truss Analysis
+import numpy as np
+
+# SciPy is optional. Without it every system is solved densely with NumPy.
+try:
+    import scipy.linalg
+    import scipy.sparse
+    import scipy.sparse.linalg
+    import scipy.sparse.csgraph
+    import scipy.linalg.lapack
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+
+""" -------------------------------------------------------------------
+    buildMatrix
+    -------------------------------------------------------------------
+    rows, cols, vals - triplets describing the nonzero coefficients
+    shape            - (number of equations, number of unknowns)
+    sparse           - build a SciPy sparse matrix if SciPy is available
+
+    Duplicate (row, col) entries are summed, just as they would be if the
+    coefficients were accumulated by hand.
+"""
+def buildMatrix(rows, cols, vals, shape, sparse=True):
+    if sparse and HAS_SCIPY:
+        return scipy.sparse.csc_matrix((vals, (rows, cols)), shape=shape)
+
+    a = np.zeros(shape)
+    np.add.at(a, (np.asarray(rows, dtype=int), np.asarray(cols, dtype=int)), vals)
+    return a
+
+
+def isSparse(a):
+    return HAS_SCIPY and scipy.sparse.issparse(a)
+
+
+class Factorization(object):
+    """
+    LU factorization of a square system of equations. Sparse matrices are
+    factored with SuperLU, dense matrices with LAPACK. Raises
+    np.linalg.LinAlgError if the matrix is not square or is singular, so callers
+    only ever need to handle one kind of failure.
+    """
+    def __init__(self, a):
+        if a.shape[0] != a.shape[1]:
+            raise np.linalg.LinAlgError("Matrix is not square (%d x %d)" % a.shape)
+
+        self.shape = a.shape
+        self.isSparse = isSparse(a)
+
+        if self.isSparse:
+            try:
+                self.lu = scipy.sparse.linalg.splu(scipy.sparse.csc_matrix(a))
+            except RuntimeError as error:
+                # SuperLU reports a singular matrix as a RuntimeError
+                raise np.linalg.LinAlgError(str(error))
+
+        elif HAS_SCIPY:
+            lu, piv = scipy.linalg.lu_factor(np.asarray(a), check_finite=False)
+            if not np.all(np.diag(lu)):
+                raise np.linalg.LinAlgError("Singular matrix")
+            self.lu = (lu, piv)
+
+        else:
+            # No factorization available, keep the matrix and solve from scratch
+            self.lu = np.asarray(a)
+
+    def solve(self, b):
+        """ Solves for one right hand side vector or a (n x k) block of them. """
+        if self.isSparse:
+            return self.lu.solve(np.asarray(b, dtype=float))
+        if HAS_SCIPY:
+            return scipy.linalg.lu_solve(self.lu, b, check_finite=False)
+        return np.linalg.solve(self.lu, b)
+
+
+def solve(a, b):
+    """ Factors a and solves a x = b in one step. """
+    return Factorization(a).solve(b)
+
+
+""" -------------------------------------------------------------------
+    conditionEstimate
+    -------------------------------------------------------------------
+    a             - dense or sparse square matrix
+    factorization - any factorization of a from this module
+
+    Returns a cheap estimate of the infinity norm condition number of a,
+    ||a|| ||a^-1||. ||a^-1|| is bounded from below by ||a^-1 b|| for a
+    few vectors b of +1 and -1, so this costs numVectors solves with the
+    existing factorization and is usually within a small factor of the
+    true value. Returns inf if a solve fails.
+"""
+def conditionEstimate(a, factorization, numVectors=3):
+    # All ones, alternating signs, then random signs
+    signs = np.where(np.random.RandomState(0).standard_normal((a.shape[0], numVectors)) < 0, -1.0, 1.0)
+    signs[:,0] = 1.0
+    if numVectors > 1:
+        signs[:,1] = 1.0
+        signs[1::2,1] = -1.0
+    try:
+        x = factorization.solve(signs)
+    except np.linalg.LinAlgError:
+        return float('inf')
+    return _normInf(a) * float(np.abs(x).max(initial=0.0))
+
+
+class CholeskyFactorization(object):
+    """
+    Factorization of a symmetric positive definite system, such as the stiffness matrix of a
+    supported structure. Dense matrices use LAPACK's Cholesky factorization. Sparse matrices use
+    SuperLU in symmetric mode: a fill reducing ordering of A + A^T and pivots taken from the
+    diagonal only, which makes it an LDL^T factorization in all but name. Raises
+    np.linalg.LinAlgError if the matrix is not positive definite, which for a stiffness matrix
+    means the structure is a mechanism.
+    """
+    def __init__(self, a, tolerance=1e-12):
+        if a.shape[0] != a.shape[1]:
+            raise np.linalg.LinAlgError("Matrix is not square (%d x %d)" % a.shape)
+
+        self.shape = a.shape
+        self.isSparse = isSparse(a)
+
+        diagonal = a.diagonal()
+        if not np.all(np.isfinite(diagonal)):
+            raise np.linalg.LinAlgError("Matrix has non-finite entries")
+        # Pivots this small relative to the largest diagonal entry are round-off, not stiffness
+        threshold = tolerance * np.abs(diagonal).max(initial=0.0)
+
+        if self.isSparse:
+            try:
+                self.lu = scipy.sparse.linalg.splu(scipy.sparse.csc_matrix(a), permc_spec="MMD_AT_PLUS_A",
+                                                   diag_pivot_thresh=0.0, options=dict(SymmetricMode=True))
+            except RuntimeError as error:
+                raise np.linalg.LinAlgError(str(error))
+            if not np.all(self.lu.U.diagonal() > threshold):
+                raise np.linalg.LinAlgError("Matrix is not positive definite")
+
+        elif HAS_SCIPY:
+            try:
+                self.lu = scipy.linalg.cho_factor(np.asarray(a), check_finite=False)
+            except scipy.linalg.LinAlgError as error:
+                raise np.linalg.LinAlgError(str(error))
+            if not np.all(np.diag(self.lu[0])**2 > threshold):
+                raise np.linalg.LinAlgError("Matrix is not positive definite")
+
+        else:
+            self.lu = np.asarray(a)
+            if not np.all(np.diag(np.linalg.cholesky(self.lu))**2 > threshold):
+                raise np.linalg.LinAlgError("Matrix is not positive definite")
+
+    def solve(self, b):
+        """ Solves for one right hand side vector or a (n x k) block of them. """
+        if self.isSparse:
+            return self.lu.solve(np.asarray(b, dtype=float))
+        if HAS_SCIPY:
+            return scipy.linalg.cho_solve(self.lu, b, check_finite=False)
+        return np.linalg.solve(self.lu, b)
+
+
+""" -------------------------------------------------------------------
+    bandOrdering
+    -------------------------------------------------------------------
+    edges       - (E x 2) pairs of connected vertices, e.g. the joints
+                  at the ends of each member
+    numVertices - number of vertices
+
+    Returns the vertices renumbered by the reverse Cuthill-McKee
+    algorithm (order[k] is the vertex that comes k-th). Neighbouring
+    vertices end up close together, so the equations that couple them
+    fall in a narrow band around the diagonal no matter what order the
+    vertices were created in. Without SciPy the order is unchanged.
+"""
+def bandOrdering(edges, numVertices):
+    if not HAS_SCIPY or not numVertices:
+        return np.arange(numVertices)
+
+    edges = np.asarray(edges, dtype=int).reshape(-1, 2)
+    graph = scipy.sparse.csr_matrix((np.ones(len(edges)), (edges[:,0], edges[:,1])), shape=(numVertices, numVertices))
+    return np.asarray(scipy.sparse.csgraph.reverse_cuthill_mckee(graph, symmetric_mode=False), dtype=int)
+
+
+class BandedFactorization(object):
+    """
+    LU factorization of a square matrix that only stores and factors the band around its
+    diagonal (LAPACK gbtrf, with partial pivoting inside the band). For a matrix of size n and
+    bandwidth b this costs O(n b) memory and O(n b^2) time rather than O(n^2) and O(n^3).
+
+    rowOrder lists the rows in the order they are factored (see bandOrdering). The columns are
+    then taken in the order of the first row they touch, which keeps them in the same band.
+    Requires SciPy. Raises np.linalg.LinAlgError if the matrix is not square or is singular.
+    """
+    def __init__(self, a, rowOrder=None):
+        if a.shape[0] != a.shape[1]:
+            raise np.linalg.LinAlgError("Matrix is not square (%d x %d)" % a.shape)
+
+        self.shape = a.shape
+        self.isSparse = True
+        n = a.shape[0]
+        coo = scipy.sparse.coo_matrix(a)
+
+        self.rowOrder = np.arange(n) if rowOrder is None else np.asarray(rowOrder, dtype=int)
+        rowPosition = _positions(self.rowOrder)
+        i = rowPosition[coo.row]
+
+        firstRow = np.full(n, n)
+        np.minimum.at(firstRow, coo.col, i)
+        self.colOrder = np.argsort(firstRow, kind='stable')
+        j = _positions(self.colOrder)[coo.col]
+
+        self.kl = int(max((i - j).max(initial=0), 0))
+        self.ku = int(max((j - i).max(initial=0), 0))
+
+        # LAPACK band storage, with kl extra rows on top for the fill-in from pivoting
+        ab = np.zeros((2*self.kl + self.ku + 1, n))
+        np.add.at(ab, (self.kl + self.ku + i - j, j), coo.data)
+        self.lu, self.piv, info = scipy.linalg.lapack.dgbtrf(ab, self.kl, self.ku)
+        if info > 0:
+            raise np.linalg.LinAlgError("Singular matrix")
+
+    def solve(self, b):
+        """ Solves for one right hand side vector or a (n x k) block of them. """
+        b = np.asarray(b, dtype=float)
+        x, info = scipy.linalg.lapack.dgbtrs(self.lu, self.kl, self.ku, b[self.rowOrder], self.piv)
+        result = np.empty_like(x)
+        result[self.colOrder] = x
+        return result
+
+
+class BandedCholeskyFactorization(object):
+    """
+    Cholesky factorization of a symmetric positive definite matrix that only stores and factors
+    the band around its diagonal once its rows and columns are put in the given order. Requires
+    SciPy. Raises np.linalg.LinAlgError if the matrix is not positive definite, see
+    CholeskyFactorization.
+    """
+    def __init__(self, a, order=None, tolerance=1e-12):
+        if a.shape[0] != a.shape[1]:
+            raise np.linalg.LinAlgError("Matrix is not square (%d x %d)" % a.shape)
+
+        self.shape = a.shape
+        self.isSparse = True
+        n = a.shape[0]
+        coo = scipy.sparse.coo_matrix(a)
+        if not np.all(np.isfinite(coo.data)):
+            raise np.linalg.LinAlgError("Matrix has non-finite entries")
+
+        self.order = np.arange(n) if order is None else np.asarray(order, dtype=int)
+        position = _positions(self.order)
+        i = position[coo.row]
+        j = position[coo.col]
+
+        # Upper band storage: entry (i, j) with i <= j goes to ab[u + i - j, j]
+        upper = i <= j
+        self.u = int((j - i).max(initial=0))
+        ab = np.zeros((self.u + 1, n))
+        np.add.at(ab, (self.u + i[upper] - j[upper], j[upper]), coo.data[upper])
+
+        threshold = tolerance * np.abs(ab[self.u]).max(initial=0.0)
+        try:
+            self.cb = scipy.linalg.cholesky_banded(ab, lower=False, check_finite=False)
+        except scipy.linalg.LinAlgError as error:
+            raise np.linalg.LinAlgError(str(error))
+        if not np.all(self.cb[self.u]**2 > threshold):
+            raise np.linalg.LinAlgError("Matrix is not positive definite")
+
+    def solve(self, b):
+        """ Solves for one right hand side vector or a (n x k) block of them. """
+        b = np.asarray(b, dtype=float)
+        x = scipy.linalg.cho_solve_banded((self.cb, False), b[self.order], check_finite=False)
+        result = np.empty_like(x)
+        result[self.order] = x
+        return result
+
+
+class UpdatableFactorization(object):
+    """
+    Factorization that follows a matrix through small changes without refactoring it. The
+    matrix A0 given at construction (or at the last refactor) is factored once. A later matrix
+    A that differs from A0 in only a few columns C is written as A = A0 + U E^T, where U holds
+    the changed part of those columns and E selects them, and systems are solved with the
+    Woodbury identity:
+
+        A^-1 b = y - Z (I + Z[C])^-1 y[C]      with y = A0^-1 b and Z = A0^-1 U
+
+    Moving a joint of a truss only changes the columns of the members attached to it, so a
+    drag costs a handful of back-substitutions instead of a new factorization.
+
+    The matrix is refactored when more than maxRank columns have changed since A0, when the
+    shape or storage of the matrix changes, or when the residual of a solution shows that the
+    update has lost accuracy.
+    """
+    def __init__(self, a, maxRank=32, tolerance=1e-9):
+        self.maxRank = maxRank
+        self.tolerance = tolerance
+        self.refactorCount = 0
+        self.updateCount = 0
+        self.refactor(a)
+
+    def refactor(self, a):
+        self.base = Factorization(a)
+        self.a0 = a
+        self.a = a
+        self.norm = _normInf(a)
+        self.columns = np.zeros(0, dtype=int)
+        self.z = None
+        self.capacitance = None
+        self.refactorCount += 1
+
+    def update(self, a):
+        """ Makes a the matrix that solve() works with. """
+        if a.shape != self.a0.shape or isSparse(a) != self.base.isSparse:
+            self.refactor(a)
+            return
+
+        diff = a - self.a0
+        if isSparse(diff):
+            diff = scipy.sparse.csc_matrix(diff)
+            diff.eliminate_zeros()
+            columns = np.flatnonzero(np.diff(diff.indptr))
+        else:
+            columns = np.flatnonzero(np.any(diff != 0, axis=0))
+
+        if len(columns) > self.maxRank:
+            self.refactor(a)
+            return
+
+        # The norm of A0 stands in for the norm of A, only members' directions have changed
+        self.a = a
+        self.columns = columns
+        self.updateCount += 1
+        if not len(columns):
+            self.z = None
+            self.capacitance = None
+            return
+
+        u = diff[:,columns]
+        u = u.toarray() if isSparse(u) else np.asarray(u)
+        self.z = self.base.solve(u)
+        self.capacitance = np.eye(len(columns)) + self.z[columns]
+
+    def solve(self, b):
+        x = self._solve(b)
+
+        # Fall back to a fresh factorization if the update has drifted
+        residual = self.a.dot(x) - b
+        if np.abs(residual).max(initial=0.0) > self.tolerance * (self.norm * np.abs(x).max(initial=0.0) + np.abs(b).max(initial=0.0)):
+            self.refactor(self.a)
+            x = self.base.solve(b)
+
+        return x
+
+    def _solve(self, b):
+        y = self.base.solve(b)
+        if self.z is None:
+            return y
+
+        try:
+            return y - self.z.dot(np.linalg.solve(self.capacitance, y[self.columns]))
+        except np.linalg.LinAlgError:
+            # The update itself is singular, let a full factorization decide
+            self.refactor(self.a)
+            return self.base.solve(b)
+
+
+def _normInf(a):
+    """ Infinity norm (maximum absolute row sum) of a dense or sparse matrix """
+    if not a.shape[0]:
+        return 0.0
+    return float(abs(a).sum(axis=1).max())
+
+
+def _positions(order):
+    """ Inverse of a permutation: where each element of order ended up """
+    position = np.empty(len(order), dtype=int)
+    position[order] = np.arange(len(order))
+    return position
@@ -0,0 +1,101 @@
+# Spatial Index for Joints and Members
+import math
+import numpy as np
+
+class GridIndex(object):
+    """
+    Uniform grid hash over the plane. Each cell of size cellSize x cellSize keeps the set of
+    items that touch it, so looking up the items near a point only visits the few cells around
+    it instead of every item. Points touch a single cell and segments touch exactly the cells
+    they pass through.
+    """
+    def __init__(self, cellSize=20):
+        self.cellSize = float(cellSize)
+        self.cells = {}
+        self.itemCells = {}
+
+    def __len__(self):
+        return len(self.itemCells)
+
+    def __contains__(self, item):
+        return item in self.itemCells
+
+    def cell(self, x, y):
+        return (int(math.floor(x / self.cellSize)), int(math.floor(y / self.cellSize)))
+
+    def insertPoint(self, item, x, y):
+        self._insert(item, [self.cell(x, y)])
+
+    def insertPoints(self, items, coords):
+        """ Inserts many new points at once, coords is an (N x 2) array in the order of items """
+        cells = np.floor(np.asarray(coords, dtype=float).reshape(-1, 2) / self.cellSize).astype(int).tolist()
+        for item, (cx, cy) in zip(items, cells):
+            self._insert(item, [(cx, cy)], isNew=True)
+
+    def insertSegments(self, items, segments):
+        """ Inserts many new segments at once, segments is an (N x 4) array of x1, y1, x2, y2 """
+        for item, segment in zip(items, np.asarray(segments, dtype=float).reshape(-1, 4).tolist()):
+            self._insert(item, self.segmentCells(*segment), isNew=True)
+
+    def insertSegment(self, item, x1, y1, x2, y2):
+        self._insert(item, self.segmentCells(x1, y1, x2, y2))
+
+    def remove(self, item):
+        for cell in self.itemCells.pop(item, ()):
+            items = self.cells[cell]
+            items.discard(item)
+            if not items:
+                del self.cells[cell]
+
+    def query(self, x, y, rng):
+        """ Returns the set of items touching any cell within rng of (x,y) in either direction """
+        minX, minY = self.cell(x - rng, y - rng)
+        maxX, maxY = self.cell(x + rng, y + rng)
+
+        found = set()
+        if (maxX - minX + 1) * (maxY - minY + 1) > len(self.cells):
+            # Huge query window, cheaper to walk the occupied cells
+            for (cx, cy), items in self.cells.items():
+                if minX <= cx <= maxX and minY <= cy <= maxY:
+                    found.update(items)
+            return found
+
+        for cx in range(minX, maxX + 1):
+            for cy in range(minY, maxY + 1):
+                items = self.cells.get((cx, cy))
+                if items:
+                    found.update(items)
+        return found
+
+    def segmentCells(self, x1, y1, x2, y2):
+        """ Returns the cells that the segment from (x1,y1) to (x2,y2) passes through """
+        if x1 > x2:
+            x1, y1, x2, y2 = x2, y2, x1, y1
+
+        startCol = self.cell(x1, y1)[0]
+        endCol = self.cell(x2, y2)[0]
+        cells = []
+        for col in range(startCol, endCol + 1):
+            # Portion of the segment inside this column of cells
+            left = max(x1, col * self.cellSize)
+            right = min(x2, (col + 1) * self.cellSize)
+            if x2 != x1:
+                slope = (y2 - y1) / (x2 - x1)
+                yLeft = y1 + slope * (left - x1)
+                yRight = y1 + slope * (right - x1)
+            else:
+                yLeft, yRight = y1, y2
+
+            lowRow = self.cell(left, min(yLeft, yRight))[1]
+            highRow = self.cell(left, max(yLeft, yRight))[1]
+            for row in range(lowRow, highRow + 1):
+                cells.append((col, row))
+
+        return cells
+
+    def _insert(self, item, cells, isNew=False):
+        if not isNew:
+            self.remove(item)
+        self.itemCells[item] = cells
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(item)
@@ -0,0 +1,156 @@
+# Direct Stiffness Analysis of Trusses
+import numpy as np
+import solver
+
+""" -------------------------------------------------------------------
+    assembleStiffness
+    -------------------------------------------------------------------
+    coords       - (J x 2) joint coordinates
+    memberJoints - (M x 2) start and end joint index of each member
+    EA           - (M) axial stiffness (modulus times area) of each member
+    sparse       - build a SciPy sparse matrix if SciPy is available
+
+    Returns (K, unit, length): the (2J x 2J) global stiffness matrix,
+    where joint i owns rows and columns 2i (X) and 2i+1 (Y), the (M x 2)
+    unit vectors from the start to the end of each member and their
+    lengths. Each member adds EA/L [c c^T, -c c^T; -c c^T, c c^T] to
+    the rows and columns of its two joints, scattered in one go from
+    the member arrays.
+"""
+def assembleStiffness(coords, memberJoints, EA, sparse=True):
+    coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+    memberJoints = np.asarray(memberJoints, dtype=int).reshape(-1, 2)
+    size = 2*len(coords)
+
+    d = coords[memberJoints[:,1]] - coords[memberJoints[:,0]]
+    length = np.hypot(d[:,0], d[:,1])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Zero length members give non-finite stiffness, which the factorization rejects
+        unit = d / length[:,np.newaxis]
+        k = np.asarray(EA, dtype=float) / length
+
+    # Degrees of freedom of each member: start X, start Y, end X, end Y
+    dofs = np.column_stack((2*memberJoints[:,0], 2*memberJoints[:,0]+1, 2*memberJoints[:,1], 2*memberJoints[:,1]+1))
+    signedUnit = np.column_stack((-unit, unit))
+    blocks = k[:,np.newaxis,np.newaxis] * signedUnit[:,:,np.newaxis] * signedUnit[:,np.newaxis,:]
+
+    rows = np.repeat(dofs, 4, axis=1).ravel()
+    cols = np.tile(dofs, (1, 4)).ravel()
+    k = solver.buildMatrix(rows, cols, blocks.ravel(), (size, size), sparse=sparse)
+    return k, unit, length
+
+
+class StiffnessSolution(object):
+    """
+    Result of a direct stiffness analysis, as returned by StiffnessModel.solve. Rows follow the
+    joint, member and support order given to the model.
+        displacements - (J x 2) displacement of each joint
+        memberForces  - (M) axial force in each member, tension positive
+        reactions     - (S x 2) force exerted by each support on its joint
+    """
+    def __init__(self, displacements, memberForces, reactions):
+        self.displacements = displacements
+        self.memberForces = memberForces
+        self.reactions = reactions
+
+
+class StiffnessModel(object):
+    """
+    Assembled and factored stiffness equations of a truss, which can be solved for any number
+    of load vectors. Unlike the method of joints this handles statically indeterminate trusses
+    and any number of supports.
+
+    Parameters:
+        coords, memberJoints, EA - see assembleStiffness
+        supports - sequence of (joint index, angle) pairs. An angle of None is a pinned support
+                   that stops both directions; otherwise the support is a roller that only stops
+                   motion along the given direction, in degrees from the X axis (the
+                   rollerAngle of a Joint, 90 for a roller on level ground).
+        sparse   - factor with a sparse solver. Otherwise (and if SciPy is available) K is
+                   factored as a band, with the joints taken in jointOrder.
+        jointOrder - order of the joints for the banded factorization, defaults to
+                     solver.bandOrdering of the members
+
+    The degrees of freedom of every inclined roller are rotated to lie along and across its
+    direction, so each support simply removes rows and columns from K. The remaining matrix is
+    symmetric positive definite unless the truss is a mechanism, in which case
+    np.linalg.LinAlgError is raised.
+    """
+    def __init__(self, coords, memberJoints, EA, supports, sparse=True, jointOrder=None):
+        self.numJoints = len(np.asarray(coords).reshape(-1, 2))
+        self.memberJoints = np.asarray(memberJoints, dtype=int).reshape(-1, 2)
+        self.EA = np.broadcast_to(np.asarray(EA, dtype=float), (len(self.memberJoints),))
+        self.supports = list(supports)
+        size = 2*self.numJoints
+
+        banded = not sparse and solver.HAS_SCIPY
+        k, self.unit, self.length = assembleStiffness(coords, self.memberJoints, self.EA, sparse=sparse or banded)
+
+        # Rotation from global degrees of freedom to support aligned ones. It is the identity
+        # except at rollers, whose first degree of freedom becomes the restrained direction.
+        rows, cols, vals = [np.arange(size)], [np.arange(size)], [np.ones(size)]
+        restrained = []
+        self.directions = np.zeros((len(self.supports), 2))
+        for s, (joint, angle) in enumerate(self.supports):
+            x, y = 2*joint, 2*joint+1
+            if angle is None:
+                restrained.extend((x, y))
+                continue
+
+            c, n = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+            self.directions[s] = (c, n)
+            vals[0][[x, y]] = c
+            rows.append([x, y])
+            cols.append([y, x])
+            vals.append([n, -n])
+            restrained.append(x)
+
+        if len(set(restrained)) != len(restrained):
+            raise ValueError("A joint can only have one support")
+
+        self.rotation = solver.buildMatrix(np.concatenate(rows), np.concatenate(cols), np.concatenate(vals),
+                                           (size, size), sparse=sparse or banded)
+        self.restrained = np.array(restrained, dtype=int)
+        self.free = np.setdiff1d(np.arange(size), self.restrained)
+
+        # K in support aligned coordinates, R K R^T
+        self.k = self.rotation.dot(k).dot(self.rotation.T)
+        if solver.isSparse(self.k):
+            self.k = self.k.tocsc()
+            kFree = self.k[self.free][:,self.free]
+        else:
+            kFree = self.k[np.ix_(self.free, self.free)]
+
+        if banded:
+            if jointOrder is None:
+                jointOrder = solver.bandOrdering(self.memberJoints, self.numJoints)
+            # Free degrees of freedom sorted by the position of their joint in jointOrder
+            position = np.empty(self.numJoints, dtype=int)
+            position[jointOrder] = np.arange(self.numJoints)
+            freeOrder = np.argsort(2*position[self.free // 2] + self.free % 2)
+            self.factorization = solver.BandedCholeskyFactorization(kFree, freeOrder)
+        else:
+            self.factorization = solver.CholeskyFactorization(kFree)
+
+    def solve(self, loads):
+        """ Solves for the (J x 2) external loads on the joints and returns a StiffnessSolution """
+        f = self.rotation.dot(np.asarray(loads, dtype=float).ravel())
+
+        u = np.zeros(2*self.numJoints)
+        u[self.free] = self.factorization.solve(f[self.free])
+
+        # Forces the supports must supply, in support aligned coordinates
+        r = self.k.dot(u) - f
+        displacements = self.rotation.T.dot(u).reshape(-1, 2)
+
+        elongation = np.einsum('ij,ij->i', self.unit, displacements[self.memberJoints[:,1]] - displacements[self.memberJoints[:,0]])
+        memberForces = self.EA / self.length * elongation
+
+        reactions = np.zeros((len(self.supports), 2))
+        for s, (joint, angle) in enumerate(self.supports):
+            if angle is None:
+                reactions[s] = r[2*joint:2*joint+2]
+            else:
+                reactions[s] = r[2*joint] * self.directions[s]
+
+        return StiffnessSolution(displacements, memberForces, reactions)
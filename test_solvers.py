@@ -0,0 +1,153 @@
+# Tests of the Truss Solvers
+import json
+import numpy as np
+import pytest
+
+import solver
+import trusscli
+from benchmarks import prattTruss
+from truss import Truss, buildTruss, loadTruss, trussFromFile
+
+
+def memberForces(truss):
+    return np.array([member.force for member in truss.getMembers()], dtype=float)
+
+
+def triangle():
+    """ Returns a triangle a, b, c with a load on its apex c and no supports """
+    truss = Truss("triangle")
+    a = truss.addJoint(0, 0)
+    b = truss.addJoint(4, 0)
+    c = truss.addJoint(2, 3)
+    truss.addMember(a, b)
+    truss.addMember(b, c)
+    truss.addMember(a, c)
+    truss.setExternalLoad(c, 0, -10)
+    return truss, a, b, c
+
+
+def test_solversAgree():
+    """ Sparse, dense and banded method of joints and the stiffness method give the same forces """
+    truss = prattTruss(12)
+    assert truss.analyze()
+    sparse = memberForces(truss)
+    reactions = [truss.getForce(key) for key in ("roller", "fixedX", "fixedY")]
+
+    a, b, unknowns = truss.assembleEquations(sparse=False)
+    dense = dict(zip(unknowns, np.linalg.solve(a, b)))
+    assert np.allclose([dense[member] for member in truss.getMembers()], sparse)
+    assert np.allclose([dense[key] for key in ("roller", "fixedX", "fixedY")], reactions)
+
+    assert truss.analyze(sparse=False)
+    assert isinstance(truss.factorization, solver.BandedFactorization)
+    assert np.allclose(memberForces(truss), sparse)
+
+    assert truss.analyzeStiffness()
+    assert np.allclose(memberForces(truss), sparse)
+    assert np.allclose([truss.getForce(key) for key in ("roller", "fixedX", "fixedY")], reactions)
+
+
+def test_incrementalUpdateMatchesRefactor():
+    truss = prattTruss(12)
+    truss.incremental = True
+    assert truss.analyze()
+
+    joint = truss.getJoints()[-3]
+    for step in range(5):
+        truss.moveJointTo(joint, joint.getX() + 0.5, joint.getY() + 0.25)
+        assert truss.analyze()
+    assert truss.factorization.updateCount > 0
+
+    fresh = trussFromFile(truss.getSnapshot())
+    assert fresh.analyze()
+    assert np.allclose(memberForces(truss), memberForces(fresh))
+
+    a, b, unknowns = truss.assembleEquations()
+    assert np.allclose(truss.factorization.solve(b), solver.Factorization(a).solve(b))
+
+
+def test_saveLoadRoundTrip(tmp_path):
+    truss = prattTruss(8)
+    truss.setMemberStiffness(truss.getMembers()[3], 2.5)
+    fileName = str(tmp_path / "pratt.truss")
+    truss.save(fileName)
+    loaded = loadTruss(fileName)
+
+    saved, read = truss.getSnapshot(), loaded.getSnapshot()
+    for name in ("coords", "loads", "memberJoints", "memberEA", "fixedJoints", "rollerJoints", "rollerAngles"):
+        assert np.array_equal(getattr(read, name), getattr(saved, name)), name
+
+    assert truss.analyze() and loaded.analyze()
+    assert np.allclose(memberForces(loaded), memberForces(truss))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_pebbleGameMatchesRigidityMatrix(seed):
+    """ The pebble game counts as many independent members as the rank of the rigidity matrix
+        of a generic placement of the joints """
+    random = np.random.RandomState(seed)
+    numJoints = random.randint(3, 9)
+    pairs = [(i, j) for i in range(numJoints) for j in range(i + 1, numJoints)]
+    chosen = random.choice(len(pairs), size=random.randint(1, len(pairs)), replace=False)
+    memberJoints = np.array([pairs[k] for k in sorted(chosen)])
+    coords = random.uniform(0, 100, (numJoints, 2))
+    truss = buildTruss(coords, memberJoints)
+
+    rigidity = np.zeros((len(memberJoints), 2*numJoints))
+    for row, (i, j) in enumerate(memberJoints):
+        d = coords[i] - coords[j]
+        rigidity[row, 2*i:2*i+2] = d
+        rigidity[row, 2*j:2*j+2] = -d
+    rank = np.linalg.matrix_rank(rigidity)
+
+    diagnosis = truss.diagnose()
+    assert len(memberJoints) - len(diagnosis.redundantMembers) == rank
+    assert diagnosis.isRigid == (rank == 2*numJoints - 3)
+
+
+def test_zeroLengthMember():
+    truss, a, b, c = triangle()
+    truss.markFixedJoint(a)
+    truss.markRollerJoint(b)
+    assert truss.analyze()
+
+    truss.moveJointTo(c, 0, 0)
+    member = truss.getMembers()[2]
+    assert np.isnan(member.getDirection(a)).all()
+    assert any(np.isnan(force) for force in a.forcesX.values())
+    assert "Number of Members: 3" in str(truss)
+    assert not truss.analyze()
+
+
+def test_methodOfJointsNeedsOneFixedJointAndOneRoller():
+    truss, a, b, c = triangle()
+    coords = np.array([[[0, 0], [4, 0], [2, 3]]], dtype=float)
+    forces, reactions = truss.analyzeVariants(coords)
+    assert np.isnan(forces).all() and np.isnan(reactions).all()
+
+    truss.markFixedJoint(a)
+    truss.markRollerJoint(b)
+    truss.markFixedJoint(c)
+    assert not truss.analyze()
+    assert not truss.diagnose().jointMethodSupports
+    assert np.isnan(truss.analyzeVariants(coords)[0]).all()
+    assert truss.analyzeStiffness()
+
+
+@pytest.mark.parametrize("loads", [{"B": 5}, {"B": [1, 2, 3]}, {"B": ["a", 1]}, {"B": None}, [[0, 1]]])
+def test_readLoadCasesRejectsBadLoads(tmp_path, loads):
+    fileName = tmp_path / "cases.json"
+    fileName.write_text(json.dumps({"dead": loads}))
+    with pytest.raises(ValueError):
+        trusscli.readLoadCases(str(fileName))
+
+    with pytest.raises(SystemExit) as error:
+        trusscli.main([str(tmp_path), "-l", str(fileName)])
+    assert error.value.code == 2
+
+
+def test_readLoadCases(tmp_path):
+    cases = {"dead": {"B": [0, -16.5], "C": [0, -16.5]}, "wind": {"E": [4, 0]}}
+    fileName = tmp_path / "cases.json"
+    fileName.write_text(json.dumps(cases))
+    assert trusscli.readLoadCases(str(fileName)) == cases
@@ -1,18 +1,73 @@
 import numpy as np
 import pickle
+import solver
+from trussarrays import TrussArrays
+import variants
+from spatialindex import GridIndex
+from registry import Registry
+import rigidity
+import stiffness
+import trussfile
+import profiling
 
 class Joint(object):
-    def __init__(self,x,y):
-        self.location = [x,y]
-        self.members = []
-        self.forcesX = {"constant": 0.0}
-        self.forcesY = {"constant": 0.0}
-        self.neighborJoints = []
+    def __init__(self,x,y,store=None,index=None):
+        # The coordinates and load of a joint live in a TrussArrays store. A joint created on
+        # its own gets a private store; joints created by a Truss share the truss's store.
+        # Joints built in bulk pass the index of the row that already holds them.
+        if store is None:
+            store = TrussArrays(capacity=1)
+        self.store = store
+        self.index = store.addJoint(x, y, self) if index is None else index
+
+        # Adjacency map from each neighboring joint to the member connecting it to this joint
+        self.neighbors = {}
 
         # Flags for Fixed / Roller
         self.isFixed = False
         self.isRoller = False
 
+    @property
+    def members(self):
+        return list(self.neighbors.values())
+
+    @property
+    def neighborJoints(self):
+        return list(self.neighbors)
+
+    @property
+    def location(self):
+        """ View of this joint's row in the coordinate array, writes go straight to the store """
+        return self.store._coords[self.index]
+
+    @property
+    def forcesX(self):
+        """
+        Coefficients of the equilibrium equation for the X direction at this joint, keyed by
+        unknown: the direction cosine of each member, "fixedX" and "roller" for supports and
+        "constant" for the external load. Built on demand from the backing store.
+        """
+        return self.getForces(0)
+
+    @property
+    def forcesY(self):
+        """ Same as forcesX but for the Y direction (direction sines, "fixedY") """
+        return self.getForces(1)
+
+    def getForces(self, axis):
+        forces = {"constant": self.store._loads.item(self.index, axis)}
+        for member in self.neighbors.values():
+            forces[member] = member.getDirection(self)[axis]
+
+        if self.isFixed:
+            forces["fixedX" if axis == 0 else "fixedY"] = 1.0
+
+        if self.isRoller:
+            angle = np.radians(self.rollerAngle)
+            forces["roller"] = np.cos(angle) if axis == 0 else np.sin(angle)
+
+        return forces
+
     def move(self, dx, dy):
         self.location[0] += dx
         self.location[1] += dy
@@ -20,51 +75,35 @@ class Joint(object):
         self.updateForces()
 
     def updateForces(self):
-        for member in self.members:
-            # For the system of linear equations 
-            self.forcesX[member] = member.getDX(self) / member.getLength()  # Cosine
-            self.forcesY[member] = member.getDY(self) / member.getLength()  # Sine        
-
+        """
+        Direction cosines are read from the geometry cache of the store whenever forcesX/forcesY
+        are built, so all that is needed is to mark the cache of this joint's members stale.
+        """
+        for member in self.neighbors.values():
+            member.update()
 
     def addMember(self, member):
-        if member not in self.members:
-            self.members.append(member)
-            neighborJoint = member.getOtherJoint(self)
-            if neighborJoint:
-                self.neighborJoints.append(neighborJoint)
-                
-            # For the system of linear equations 
-            self.forcesX[member] = member.getDX(self) / member.getLength()  # Cosine
-            self.forcesY[member] = member.getDY(self) / member.getLength()  # Sine
+        neighborJoint = member.getOtherJoint(self)
+        if neighborJoint and neighborJoint not in self.neighbors:
+            self.neighbors[neighborJoint] = member
 
     def deleteMember(self,member):
-        if member in self.members:
-            self.members.remove(member)
-            self.neighborJoints.remove(member.getOtherJoint(self))
-            self.updateForces()
+        neighborJoint = member.getOtherJoint(self)
+        if self.neighbors.get(neighborJoint) is member:
+            del self.neighbors[neighborJoint]
             
     def addForce(self, forceX, forceY):
-        self.forcesX["constant"] += forceX
-        self.forcesY["constant"] += forceY
+        self.store._loads[self.index] += (forceX, forceY)
 
     def setForce(self,forceX,forceY):
-        self.forcesX["constant"] = forceX
-        self.forcesY["constant"] = forceY
+        self.store._loads[self.index] = (forceX, forceY)
 
     def makeFixed(self):
-        self.forcesX["fixedX"] = 1.0
-        self.forcesY["fixedY"] = 1.0
         self.isFixed = True
         self.fixedX = None #Unknown, will be set once truss is solved
         self.fixedY = None
-        pass
 
     def makeNotFixed(self):
-        if "fixedX" in self.forcesX:
-            del self.forcesX["fixedX"]
-        if "fixedY" in self.forcesY:
-            del self.forcesY["fixedY"]
-            
         self.isFixed = False
         del self.fixedX
         del self.fixedY
@@ -74,9 +113,6 @@ class Joint(object):
         Parameters:
             angleOfSurface - the orientation of the surface (in degrees from horizontal) on which the roller rests
         """
-        self.forcesX["roller"] = np.cos(np.radians(angleOfSurface + 90))
-        self.forcesY["roller"] = np.sin(np.radians(angleOfSurface + 90))
-
         self.isRoller = True
         self.rollerX = None #Unknown, will be set once truss is solved
         self.rollerY = None
@@ -84,20 +120,15 @@ class Joint(object):
         self.rollerAngle = angleOfSurface + 90
 
     def makeNotRoller(self):
-        if "roller" in self.forcesX:
-            del self.forcesX["roller"]
-        if "roller" in self.forcesY:
-            del self.forcesY["roller"]
-
         self.isRoller = False
         del self.rollerX
         del self.rollerY
             
     def getX(self):
-        return self.location[0]
+        return self.store._coords.item(self.index, 0)
 
     def getY(self):
-        return self.location[1]
+        return self.store._coords.item(self.index, 1)
 
     def getLoc(self):
         return self.location
@@ -105,42 +136,56 @@ class Joint(object):
     def getMembers(self):
         return self.members
 
+    def getLoad(self):
+        return self.store._loads.item(self.index, 0), self.store._loads.item(self.index, 1)
+
     def getLoadMag(self):
-        loadX = self.forcesX.get('constant',0.0)
-        loadY = self.forcesY.get('constant',0.0)
+        loadX, loadY = self.getLoad()
         return np.sqrt(loadX**2+loadY**2)
 
     def isNeighbor(self, otherJoint):
         """
         Returns whether or not otherJoint is connected to this joint by one of its members
         """
-        return (otherJoint in self.neighborJoints)
+        return (otherJoint in self.neighbors)
 
     def getNeighbors(self):
         return self.neighborJoints
 
+    def getMemberTo(self, otherJoint):
+        """ Returns the member connecting this joint to otherJoint, or None """
+        return self.neighbors.get(otherJoint)
+
     def __str__(self):
         stringDisplay = "Joint " + self.id + " (%.2f, %.2f) :\n" % (self.location[0], self.location[1])
         stringDisplay += "-"*20 + '\n'
         stringDisplay += "Members: "
-        for member in self.members:
+        for member in self.neighbors.values():
             stringDisplay += member.name + '  '
         stringDisplay += '\n'
         stringDisplay += "Forces X: "
-        for forceSource in self.forcesX:
-            stringDisplay += "(" + str(self.forcesX[forceSource])+"*"+str(forceSource)+") "
+        forcesX = self.forcesX
+        for forceSource in forcesX:
+            stringDisplay += "(" + str(forcesX[forceSource])+"*"+str(forceSource)+") "
         stringDisplay += '\n'
         stringDisplay += "Forces Y: "
-        for forceSource in self.forcesY:
-            stringDisplay += "(" + str(self.forcesY[forceSource])+"*"+str(forceSource)+") "
+        forcesY = self.forcesY
+        for forceSource in forcesY:
+            stringDisplay += "(" + str(forcesY[forceSource])+"*"+str(forceSource)+") "
         return stringDisplay        
 
 
 class Member(object):
-    def __init__(self,startJoint,endJoint):
+    def __init__(self,startJoint,endJoint,store=None,index=None):
         self.startJoint = startJoint
         self.endJoint = endJoint
-        self.update()
+
+        # Members created by a Truss also record their endpoints in the truss's store, unless
+        # they were built in bulk and are already at row index
+        self.store = store
+        self.index = index
+        if store is not None and index is None:
+            self.index = store.addMember(startJoint.index, endJoint.index, self)
 
         # This force will be set once the truss is solved and every time it's changed, goes back to None.
         self.force = None
@@ -152,27 +197,37 @@ class Member(object):
     def getCoords(self):
         return (self.startJoint.getX(),self.startJoint.getY(),self.endJoint.getX(),self.endJoint.getY())
 
-    def getDX(self, referenceJoint=None):
+    def getGeometry(self):
         """
-        If getDX computes dx then there is no need to really store dx as a local variable
-        return self.dx if (referenceJoint == self.startJoint) else -self.dx
+        Returns (dx, dy, length) from the start joint to the end joint. Members of a truss read
+        them from the geometry cache of its store, which only recomputes them after a joint
+        has moved.
         """
-        if not referenceJoint:
-            return self.endJoint.getX() - self.startJoint.getX()
-        
-        if referenceJoint in (self.startJoint, self.endJoint):
-            return self.getOtherJoint(referenceJoint).getX() - referenceJoint.getX()
+        if self.store is not None:
+            return self.store.memberGeometry(self.index)
+
+        dx = self.endJoint.getX() - self.startJoint.getX()
+        dy = self.endJoint.getY() - self.startJoint.getY()
+        return dx, dy, float(np.hypot(dx, dy))
+
+    def _sign(self, referenceJoint):
+        """ 1 if the member points away from referenceJoint, -1 if towards it, None if it is not one of its joints """
+        if referenceJoint is None or referenceJoint is self.startJoint:
+            return 1
+        if referenceJoint is self.endJoint:
+            return -1
+
+    def getDX(self, referenceJoint=None):
+        """ X distance from referenceJoint (the start joint by default) to the other joint """
+        sign = self._sign(referenceJoint)
+        if sign:
+            return sign * self.getGeometry()[0]
 
     def getDY(self, referenceJoint=None):
-        """
-        If getDY computes dy then there is no need to really store dy as a local variable
-        return self.dy if (referenceJoint == self.startJoint) else -self.dy
-        """
-        if not referenceJoint:
-            return self.endJoint.getY()-self.startJoint.getY()
-        
-        if referenceJoint in (self.startJoint, self.endJoint):
-            return self.getOtherJoint(referenceJoint).getY() - referenceJoint.getY()
+        """ Y distance from referenceJoint (the start joint by default) to the other joint """
+        sign = self._sign(referenceJoint)
+        if sign:
+            return sign * self.getGeometry()[1]
 
     def getD(self, referenceJoint):
         """
@@ -180,20 +235,53 @@ class Member(object):
         compression as a negative value. It defines all forces as acting away from a joint.
         Like rays of sunshine.
         """
-        if referenceJoint in (self.startJoint, self.endJoint):
-            return (self.getDX(referenceJoint),self.getDY(referenceJoint))
-        
+        sign = self._sign(referenceJoint)
+        if sign:
+            dx, dy, length = self.getGeometry()
+            return (sign*dx, sign*dy)
+
+    def getDirection(self, referenceJoint):
+        """ Direction cosines of the member pointing away from referenceJoint """
+        sign = self._sign(referenceJoint)
+        if sign:
+            if self.store is not None:
+                ux, uy = self.store.memberDirection(self.index)
+            else:
+                dx, dy, length = self.getGeometry()
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    ux, uy = np.divide((dx, dy), length).tolist()
+            return (sign*ux, sign*uy)
+
     def getLength(self):
-        return np.sqrt(self.getDX(self.startJoint)**2 + self.getDY(self.startJoint)**2)
+        return self.getGeometry()[2]
 
     def getCenter(self):
         return (self.startJoint.getX()+self.endJoint.getX())/2, \
                (self.startJoint.getY()+self.endJoint.getY())/2
 
     def update(self):
-        self.dx = self.endJoint.getX() - self.startJoint.getX()
-        self.dy = self.endJoint.getY() - self.startJoint.getY()
-        self.length = np.sqrt(self.dx**2 + self.dy**2)
+        """ Called when one of the joints has moved, marks the cached geometry stale """
+        if self.store is not None:
+            self.store.invalidateMembers(self.index)
+
+    @property
+    def dx(self):
+        return self.getGeometry()[0]
+
+    @property
+    def dy(self):
+        return self.getGeometry()[1]
+
+    @property
+    def length(self):
+        return self.getGeometry()[2]
+
+    @property
+    def EA(self):
+        """ Axial stiffness (modulus times area) used by the stiffness method, see Truss.setMemberStiffness """
+        if self.store is None:
+            return 1.0
+        return self.store._memberEA.item(self.index)
 
     def getOtherJoint(self,joint):
         if joint == self.startJoint:
@@ -204,16 +292,51 @@ class Member(object):
             return None
 
 
+class LoadCaseSolution(object):
+    """
+    Member forces and support reactions of a truss under several load cases, as returned by
+    Truss.analyzeLoadCases. Column k of memberForces and reactions belongs to names[k].
+        memberForces - (M x K) array, rows in the order of members
+        reactions    - (3 x K) array, rows are "roller", "fixedX" and "fixedY"
+    """
+    def __init__(self, names, members, memberForces, reactions):
+        self.names = list(names)
+        self.members = list(members)
+        self.memberForces = memberForces
+        self.reactions = reactions
+
+    def getCase(self, name):
+        """ Returns the solution of one load case in the same form as Truss.forces """
+        k = self.names.index(name)
+        forces = dict(zip(self.members, self.memberForces[:,k]))
+        forces.update(zip(("roller", "fixedX", "fixedY"), self.reactions[:,k]))
+        return forces
+
+
 class Truss(object):
-    def __init__(self,name=""):
-        self.joints = []
-        self.members = []
+    def __init__(self,name="",incremental=False):
+        """
+        Parameters:
+            incremental - keep the factorization of the equations between calls to analyze and
+                          update it when only a few members change, as they do while a joint is
+                          dragged around, instead of factoring from scratch every time
+        """
+        # Joints and members keyed by stable integer ids, in the order they were added
+        self.joints = Registry()
+        self.members = Registry()
         self.name = name
 
-        # Keep track of names for joints
-        self.index = 0
+        # Coordinates, loads and connectivity of every joint and member, as arrays
+        self.store = TrussArrays()
+
+        # Grid hashes of the joints and members for finding them by location
+        self.jointIndex = GridIndex()
+        self.memberIndex = GridIndex()
+
+        # Keep track of ids and names for joints and members. Ids are never reused.
+        self.nextJointID = 0
+        self.nextMemberID = 0
         self.labels = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
-        # If we have more than 52 joints in the truss, labels will wrap around to the beginning
 
         # Track other important properties of the truss
         self.hasFixedJoint = False
@@ -223,6 +346,50 @@ class Truss(object):
         self.fixedJoint = None
         self.rollerJoint = None
 
+        # Every support of the truss. The method of joints only works with exactly one of each
+        # kind, which is also kept in fixedJoint and rollerJoint.
+        self.fixedJoints = []
+        self.rollerJoints = []
+
+        # Named load cases, each a dictionary mapping joints to (loadX, loadY)
+        self.loadCases = {}
+
+        # The factorization of the equations only depends on the geometry, topology and supports
+        # of the truss, so it is cached against a version number that is bumped whenever one of
+        # those changes. Changing loads leaves it valid.
+        self.geometryVersion = 0
+
+        # Bumped by every change that invalidates the solution, loads included, so a solution
+        # computed elsewhere (see getSnapshot and setSolution) can be checked before it is used
+        self.stateVersion = 0
+
+        # The rigidity diagnosis only depends on which joints are connected, so it is cached
+        # against a topology version that moving joints does not change
+        self.topologyVersion = 0
+        self.diagnosis = None
+        self.diagnosisVersion = None
+        self.diagnosisGeometry = None
+
+        # Joints renumbered to keep connected joints close together, for banded solves
+        self.jointOrder = None
+        self.jointOrderVersion = None
+        self.incremental = incremental
+        self.factorization = None
+        self.factorizationKey = None
+        self.unknowns = []
+
+        # Influence matrix, cached against the geometry version it was computed for
+        self.influenceMatrix = None
+        self.influenceVersion = None
+
+        # Stiffness method model and the solution of the last call to analyzeStiffness
+        self.stiffnessModel = None
+        self.stiffnessKey = None
+        self.stiffnessSolution = None
+
+        # Timers and counters of the analysis, off unless self.stats.enable() is called
+        self.stats = profiling.AnalysisStats(name)
+
     def __str__(self):
         displayString = "Truss " + self.name + '\n'
         displayString += "="*30 + '\n'
@@ -239,63 +406,145 @@ class Truss(object):
         Returns whether or not the truss is statically determinate by checking that m + 3 = 2j
         Point of Inquiry: Is this the only way for a truss to be determinate?
         """
-        return ((len(self.joints) * 2) == (len(self.members) + 3) and self.hasFixedJoint and self.hasRollerJoint)
+        return ((len(self.joints) * 2) == (len(self.members) + 3) and len(self.fixedJoints) == 1 and len(self.rollerJoints) == 1)
+
+    def makeLabel(self, uid):
+        """
+        Returns the label of the joint with the given uid. The first 52 joints are labeled with
+        single letters and later ones with a letter followed by a number (A1, B1, ..., z1, A2, ...),
+        so labels never repeat.
+        """
+        if uid < len(self.labels):
+            return self.labels[uid]
+        return self.labels[uid % len(self.labels)] + str(uid // len(self.labels))
 
     def addJoint(self, x, y):
         """
-        Creates and adds a new joint to the truss, assigning it an id as specified by the truss's list of
-        labels. Returns the newJoint.
+        Creates and adds a new joint to the truss, assigning it a unique integer uid and a label
+        (its id) as specified by the truss's list of labels. Returns the newJoint.
         """
-        newJoint = Joint(x,y)
+        newJoint = Joint(x,y,self.store)
 
         # Give joints IDs for labeling and saving purposes
-        newJoint.id = self.labels[self.index]
-        self.index += 1
-
-        # If we have run out of labels, start reusing them
-        # Note that this will cause problems with saving and opening
-        # trusses with more than 52 joints and should be improved
-        if self.index == len(self.labels):
-            self.index = 0
+        newJoint.uid = self.nextJointID
+        newJoint.id = self.makeLabel(newJoint.uid)
+        self.nextJointID += 1
         
-        self.joints.append(newJoint)
+        self.joints.add(newJoint)
+        self.jointIndex.insertPoint(newJoint, x, y)
 
         # Truss has been modified, solution no longer valid.
-        self.setUnsolved()
+        self.setGeometryChanged()
         
         return newJoint
 
+    def addArrays(self, coords, memberJoints, loads=None, memberEA=None):
+        """
+        Adds many joints and the members between them in one pass, which is much faster than
+        calling addJoint and addMember for each of them. The arrays go straight into the backing
+        store and the joint and member objects are created around them.
+
+        Parameters:
+            coords       - (J x 2) coordinates of the new joints
+            memberJoints - (M x 2) start and end of each new member, as rows of coords
+            loads        - (J x 2) external loads on the new joints, none by default
+            memberEA     - (M) axial stiffness of the new members, 1 by default
+
+        Returns (joints, members), the lists of new joints and members in the order given.
+        Raises ValueError for members that join a joint to itself, repeat another member or
+        refer to joints that do not exist.
+        """
+        coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        memberJoints = np.asarray(memberJoints, dtype=int).reshape(-1, 2)
+        numJoints = len(coords)
+
+        if len(memberJoints):
+            if memberJoints.min() < 0 or memberJoints.max() >= numJoints:
+                raise ValueError("Members refer to joints that do not exist")
+            if np.any(memberJoints[:,0] == memberJoints[:,1]):
+                raise ValueError("A member cannot join a joint to itself")
+            if len(np.unique(np.sort(memberJoints, axis=1), axis=0)) != len(memberJoints):
+                raise ValueError("Members must not repeat")
+
+        # Joints
+        firstJoint = self.store.numJoints
+        joints = [None] * numJoints
+        self.store.addJoints(coords, joints)
+        for i in range(numJoints):
+            joint = Joint(0, 0, self.store, firstJoint + i)
+            joint.uid = self.nextJointID + i
+            joint.id = self.makeLabel(joint.uid)
+            joints[i] = joint
+            self.joints.add(joint)
+        self.store.jointProxies[firstJoint:] = joints
+        self.nextJointID += numJoints
+        self.jointIndex.insertPoints(joints, coords)
+
+        if loads is not None:
+            self.store._loads[firstJoint:firstJoint + numJoints] = np.asarray(loads, dtype=float).reshape(-1, 2)
+
+        # Members
+        firstMember = self.store.numMembers
+        members = [None] * len(memberJoints)
+        self.store.addMembers(memberJoints + firstJoint, members, 1.0 if memberEA is None else memberEA)
+        for i, (start, end) in enumerate(memberJoints.tolist()):
+            startJoint, endJoint = joints[start], joints[end]
+            member = Member(startJoint, endJoint, self.store, firstMember + i)
+            member.uid = self.nextMemberID + i
+            member.name = startJoint.id + endJoint.id
+            members[i] = member
+            self.members.add(member)
+            startJoint.neighbors[endJoint] = member
+            endJoint.neighbors[startJoint] = member
+        self.store.memberProxies[firstMember:] = members
+        self.memberIndex.insertSegments(members, np.hstack((coords[memberJoints[:,0]], coords[memberJoints[:,1]])))
+        self.nextMemberID += len(memberJoints)
+
+        # Truss has been modified, solution no longer valid.
+        self.setGeometryChanged()
+        return joints, members
+
     def deleteJoint(self,joint):
         if joint in self.joints:
-            neighbors = joint.getNeighbors()
-            for j in neighbors:
-                for member in joint.getMembers():
-                    j.deleteMember(member)    # If member is not attached to j, this line does nothing
-                j.updateForces()
-
             for member in joint.getMembers():
+                member.getOtherJoint(joint).deleteMember(member)
                 self.members.remove(member)
+                self.store.removeMember(member.index)
+                self.memberIndex.remove(member)
+
+            for loads in self.loadCases.values():
+                loads.pop(joint, None)
+
+            self.removeSupport(joint)
                 
             self.joints.remove(joint)
+            self.store.removeJoint(joint.index)
+            self.jointIndex.remove(joint)
 
             # Truss has been modified, solution no longer valid.
-            self.setUnsolved()
+            self.setGeometryChanged()
 
     def addMember(self, joint1, joint2):
-        if (joint1 in self.joints) and (joint2 in self.joints):
+        if (joint1 in self.joints) and (joint2 in self.joints) and joint1 is not joint2:
             # Only add the new member if it doesn't already exist
             if not joint1.isNeighbor(joint2):
-                newMember = Member(joint1, joint2)
+                newMember = Member(joint1, joint2, self.store)
 
                 # Give members names for reference and displaying
+                newMember.uid = self.nextMemberID
                 newMember.name = joint1.id + joint2.id
+                self.nextMemberID += 1
 
                 # Add the member to the truss's list of members
-                self.members.append(newMember)
+                self.members.add(newMember)
+                self.memberIndex.insertSegment(newMember, *newMember.getCoords())
                 
                 # Add the member to both joints
                 joint1.addMember(newMember)
                 joint2.addMember(newMember)
+
+                # Truss has been modified, solution no longer valid.
+                self.setGeometryChanged()
                 return newMember
                 
         # else RaiseError
@@ -305,16 +554,21 @@ class Truss(object):
             member.startJoint.deleteMember(member)
             member.endJoint.deleteMember(member)
             self.members.remove(member)
-            
+            self.store.removeMember(member.index)
+            self.memberIndex.remove(member)
+
+            # Truss has been modified, solution no longer valid.
+            self.setGeometryChanged()
 
     def moveJoint(self, joint, dx, dy):
         if joint in self.joints:
             joint.move(dx, dy)
+            self.jointIndex.insertPoint(joint, joint.getX(), joint.getY())
             for member in joint.getMembers():
-                member.getOtherJoint(joint).updateForces()
+                self.memberIndex.insertSegment(member, *member.getCoords())
 
             # Truss has been modified, solution no longer valid.
-            self.setUnsolved()
+            self.setGeometryChanged(topologyChanged=False)
         #else RaiseError
 
     def moveJointTo(self,joint,x,y):
@@ -356,88 +610,535 @@ class Truss(object):
 
     def markFixedJoint(self,joint):
         """ Returns a bool indicating whether or not a joint was successfully marked as a
-            fixed joint. """
+            fixed joint. A truss may have any number of fixed joints, but a joint can only
+            have one support. """
         if joint not in self.joints:
             return False
             # RaiseError
             
-        if self.hasFixedJoint:
+        if joint.isFixed or joint.isRoller:
             return False
             pass # RaiseError
         
         joint.makeFixed()
-        self.fixedJoint = joint
-        self.hasFixedJoint = True
+        self.fixedJoints.append(joint)
+        if not self.hasFixedJoint:
+            self.fixedJoint = joint
+            self.hasFixedJoint = True
+        self.setGeometryChanged()
         return True
 
     def markRollerJoint(self,joint,angleOfSurface=0):
         """ Returns a bool indicating whether or not a joint was successfully marked as a
-            roller joint. """
+            roller joint. A truss may have any number of rollers, each on a surface of its
+            own angle, but a joint can only have one support. """
         if joint not in self.joints:
             return False
             # RaiseError
             
-        # If the truss already has a roller joint return a warning, but still proceed.
-        if self.hasRollerJoint:
+        if joint.isFixed or joint.isRoller:
             return False
             # RaiseError
         
         joint.makeRoller(angleOfSurface)
-        self.rollerJoint = joint
-        self.hasRollerJoint = True
+        self.rollerJoints.append(joint)
+        if not self.hasRollerJoint:
+            self.rollerJoint = joint
+            self.hasRollerJoint = True
+        self.setGeometryChanged()
         return True
+
+    def removeSupport(self, joint):
+        """ Turns a fixed or roller joint back into a free joint """
+        if joint in self.fixedJoints:
+            joint.makeNotFixed()
+            self.fixedJoints.remove(joint)
+            self.fixedJoint = self.fixedJoints[0] if self.fixedJoints else None
+            self.hasFixedJoint = bool(self.fixedJoints)
+            self.setGeometryChanged()
+
+        elif joint in self.rollerJoints:
+            joint.makeNotRoller()
+            self.rollerJoints.remove(joint)
+            self.rollerJoint = self.rollerJoints[0] if self.rollerJoints else None
+            self.hasRollerJoint = bool(self.rollerJoints)
+            self.setGeometryChanged()
+
+    def getSupports(self):
+        """ Returns (joint, angle) for every support, where angle is None for fixed joints and
+            the direction of the reaction in degrees for rollers """
+        return [(joint, None) for joint in self.fixedJoints] + \
+               [(joint, joint.rollerAngle) for joint in self.rollerJoints]
+
+    def setMemberStiffness(self, member, EA):
+        """ Sets the axial stiffness (modulus times area) of a member for analyzeStiffness.
+            Members start with EA = 1, which only matters relative to the other members. """
+        if member in self.members and EA > 0:
+            self.store._memberEA[member.index] = EA
+            self.setGeometryChanged(topologyChanged=False)
+            return True
+        return False
             
 
-    def analyze(self):
+    def assembleEquations(self, sparse=True):
         """
-        Generates a system of linear equations by using the method of joints. Then feeds these linear
-        equations into a linear algebra module from NumPy which solves for the forces in the members.
+        Generates the system of linear equations given by the method of joints. Each member
+        contributes its direction cosines to the two equations of each of its joints, so the
+        coefficients are scattered straight from the member arrays of the backing store rather
+        than looked up for every (joint, unknown) pair.
+
+        Returns (a, b, unknowns) where a is the matrix of coefficients (sparse if requested and
+        SciPy is available), b is the vector of constants and unknowns labels the columns of a.
+        The reactions are those of self.fixedJoint and self.rollerJoint, so raises
+        np.linalg.LinAlgError unless they are the only supports (see analyzeStiffness).
         """
+        if not rigidity.hasJointMethodSupports(self):
+            raise np.linalg.LinAlgError("The method of joints needs exactly one fixed joint and one roller")
 
-        # Define our unknowns. For a properly defined truss we will have M + 3 unknowns
-        unknowns = []
-        for member in self.members:
-            unknowns.append(member)
+        # Define our unknowns. For a properly defined truss we will have M + 3 unknowns.
+        # Members are taken in the order of the backing store, which is the order of its arrays.
+        unknowns = list(self.store.memberProxies)
         unknowns.append("roller")
         unknowns.append("fixedX")
         unknowns.append("fixedY")
 
-        # Collect 2 Equations from each joint.
-        #       - equations is a matrix of coefficients
-        #       - sol is the solution vector formed from the constants in the equations
-        equations = []
-        sol = []
-        for joint in self.joints:
-            eqX = []
-            eqY = []
-            for variable in unknowns:
-                eqX.append(joint.forcesX.get(variable, 0.0))
-                eqY.append(joint.forcesY.get(variable, 0.0))
-                
-            equations.append(eqX)
-            sol.append(-joint.forcesX.get("constant", 0.0))
+        # Joint i of the store owns equation 2i (sum of forces in X) and 2i+1 (sum of forces in Y)
+        b = self.getLoadVector()
+
+        # Tension is positive, so each member pulls its joints towards one another
+        unit = self.store.memberDirections()
+        cos = unit[:,0]
+        sin = unit[:,1]
+        startRow = 2*self.store.memberJoints[:,0]
+        endRow = 2*self.store.memberJoints[:,1]
+        numMembers = len(unknowns) - 3
+        col = np.arange(numMembers)
+
+        rows = [startRow, startRow+1, endRow, endRow+1]
+        cols = [col, col, col, col]
+        vals = [cos, sin, -cos, -sin]
+
+        if self.rollerJoint:
+            row = 2*self.rollerJoint.index
+            rows.append([row, row+1])
+            cols.append([numMembers, numMembers])
+            vals.append([np.cos(np.radians(self.rollerJoint.rollerAngle)),
+                         np.sin(np.radians(self.rollerJoint.rollerAngle))])
 
-            equations.append(eqY)
-            sol.append(-joint.forcesY.get("constant", 0.0))
+        if self.fixedJoint:
+            row = 2*self.fixedJoint.index
+            rows.append([row, row+1])
+            cols.append([numMembers+1, numMembers+2])
+            vals.append([1.0, 1.0])
+
+        a = solver.buildMatrix(np.concatenate(rows), np.concatenate(cols), np.concatenate(vals),
+                               (len(b), len(unknowns)), sparse=sparse)
+        return a, b, unknowns
+
+    def analyze(self, sparse=True):
+        """
+        Generates a system of linear equations by using the method of joints. Then solves these
+        linear equations for the forces in the members, with a sparse LU factorization by default
+        or with a banded one if sparse is False. The banded factorization renumbers the joints
+        with getJointOrder first, so its cost grows with the number of joints times the square of
+        the bandwidth rather than with the cube of the number of joints. Without SciPy the
+        equations are solved densely.
+
+        The factorization is cached against the geometry of the truss, so solving again after
+        only the loads have changed is a single back-substitution. In incremental mode a changed
+        geometry updates the previous factorization rather than recomputing it when only a few
+        columns of the equations differ, e.g. after moving a single joint.
+
+        Before any equations are built the truss is checked with diagnose(). Returns False if it
+        is a mechanism, is not properly supported, has other supports than one fixed joint and one
+        roller or its equations turn out to be singular, in which case self.diagnosis says why.
+        """
+        self.stats.count('analyze')
+        with self.stats.phase('diagnose'):
+            diagnosis = self.diagnose()
+        if not diagnosis.isStable() or not diagnosis.jointMethodSupports:
+            return False
 
         try:
             # Solve the system of linear equations
-            a = np.array(equations)
-            b = np.array(sol)
-            x = np.linalg.solve(a,b)
-            self.forces = dict(zip(unknowns, x))
+            factorization = self.getFactorization(sparse=sparse)
+            with self.stats.phase('solve'):
+                x = factorization.solve(self.getLoadVector())
+            self.forces = dict(zip(self.unknowns, x))
+            self.stiffnessSolution = None
             
         except np.linalg.LinAlgError:
-            # For debugging
-            print("LinAlgError: Matrix is singular or not square")
-            print(a)
-            print(b)
+            # Rigid in general, but not in this particular geometry
+            self.diagnosis.isSingular = True
             return False
         
 
-        self.setSolved()
+        with self.stats.phase('setSolved'):
+            self.setSolved()
         return True
 
+    def analyzeStiffness(self, sparse=True):
+        """
+        Solves the truss with the direct stiffness method, which unlike analyze also handles
+        statically indeterminate trusses, any number of fixed and roller supports, inclined
+        rollers and members of different stiffness (see setMemberStiffness). The stiffness
+        matrix is assembled sparsely from the backing store and factored with a symmetric
+        (Cholesky style) factorization that is cached against the geometry of the truss.
+
+        Returns False if the truss moves freely under its supports. Otherwise sets the force in
+        every member and the reactions of every support, keeps the joint displacements in
+        self.stiffnessSolution (see getDisplacement) and returns True. The reactions of
+        self.fixedJoint and self.rollerJoint are also stored under "fixedX", "fixedY" and
+        "roller" as analyze does.
+        """
+        self.stats.count('analyzeStiffness')
+        try:
+            model = self.getStiffnessModel(sparse=sparse)
+        except np.linalg.LinAlgError:
+            return False
+
+        with self.stats.phase('stiffnessSolve'):
+            solution = model.solve(self.store.loads)
+        self.stiffnessSolution = solution
+
+        with self.stats.phase('setSolved'):
+            self.setStiffnessSolved(solution)
+        return True
+
+    def setSolution(self, memberForces, reactions, displacements=None):
+        """
+        Adopts a solution computed on a copy of the truss, such as one built from getSnapshot
+        with storeOrder=True. memberForces follow the rows of the backing store, reactions are
+        the (X, Y) force of each support in the order of getSupports() and displacements, if
+        known, the (J x 2) displacements of the joints in store order. The caller must make sure
+        the truss has not changed since the copy was taken, see stateVersion.
+        """
+        solution = stiffness.StiffnessSolution(displacements, np.asarray(memberForces, dtype=float), reactions)
+        self.stiffnessSolution = solution if displacements is not None else None
+        self.setStiffnessSolved(solution)
+
+    def setStiffnessSolved(self, solution):
+        """ Sets the member forces and support reactions of a StiffnessSolution, like setSolved """
+        self.forces = dict(zip(self.store.memberProxies, solution.memberForces))
+        self.isSolved = True
+        for member in self.members:
+            member.force = self.forces[member]
+
+        for (joint, angle), (reactionX, reactionY) in zip(self.getSupports(), solution.reactions):
+            if angle is None:
+                joint.fixedX, joint.fixedY = reactionX, reactionY
+            else:
+                joint.rollerX, joint.rollerY = reactionX, reactionY
+
+        if self.fixedJoint:
+            self.forces["fixedX"] = self.fixedJoint.fixedX
+            self.forces["fixedY"] = self.fixedJoint.fixedY
+        if self.rollerJoint:
+            angle = np.radians(self.rollerJoint.rollerAngle)
+            self.forces["roller"] = self.rollerJoint.rollerX*np.cos(angle) + self.rollerJoint.rollerY*np.sin(angle)
+
+    def getStiffnessModel(self, sparse=True):
+        """
+        Returns the assembled and factored stiffness.StiffnessModel of the truss, rebuilding it
+        only if the geometry, supports or member stiffnesses have changed since the last call.
+        Raises np.linalg.LinAlgError if the truss is a mechanism.
+        """
+        key = (self.geometryVersion, sparse)
+        if self.stiffnessKey == key:
+            self.stats.count('stiffnessHits')
+            return self.stiffnessModel
+
+        supports = [(joint.index, angle) for joint, angle in self.getSupports()]
+        self.stiffnessModel = None
+        self.stiffnessKey = None
+        self.stats.count('stiffnessModels')
+        with self.stats.phase('stiffnessModel'):
+            self.stiffnessModel = stiffness.StiffnessModel(self.store.coords, self.store.memberJoints,
+                                                           self.store.memberEA, supports, sparse=sparse,
+                                                           jointOrder=self.getJointOrder())
+        self.stiffnessKey = key
+
+        if self.stats.enabled:
+            model = self.stiffnessModel
+            kFree = model.k[model.free][:,model.free] if solver.isSparse(model.k) else model.k[np.ix_(model.free, model.free)]
+            self.recordMatrixStats('stiffness', kFree, model.factorization)
+        return self.stiffnessModel
+
+    def getJointOrder(self):
+        """
+        Returns the store indices of the joints in reverse Cuthill-McKee order (see
+        solver.bandOrdering), which the banded solvers use in place of the order the joints were
+        added in. Only depends on the topology of the truss, so it is cached against it.
+        """
+        if self.jointOrderVersion != self.topologyVersion:
+            self.jointOrder = solver.bandOrdering(self.store.memberJoints, self.store.numJoints)
+            self.jointOrderVersion = self.topologyVersion
+        return self.jointOrder
+
+    def getDisplacement(self, joint):
+        """ Returns the (dx, dy) displacement of a joint found by analyzeStiffness """
+        if self.isSolved and self.stiffnessSolution is not None:
+            return tuple(self.stiffnessSolution.displacements[joint.index].tolist())
+
+    def getFactorization(self, sparse=True):
+        """
+        Returns the factorization of the equations for the current geometry of the truss. The
+        equations are only assembled and factored (or, in incremental mode, updated) if the
+        geometry has changed since the last call. Raises np.linalg.LinAlgError if the equations
+        cannot be solved.
+        """
+        key = (self.geometryVersion, sparse)
+        if self.factorizationKey == key:
+            self.stats.count('factorizationHits')
+            return self.factorization
+
+        # Without a general sparse solver, the equations are factored as a band, in an order that
+        # keeps connected joints together, so that only the band is ever stored
+        banded = not sparse and solver.HAS_SCIPY and not self.incremental
+        with self.stats.phase('assemble'):
+            a, b, unknowns = self.assembleEquations(sparse=sparse or banded)
+        try:
+            with self.stats.phase('factor'):
+                if banded:
+                    order = self.getJointOrder()
+                    self.factorization = solver.BandedFactorization(a, np.column_stack((2*order, 2*order+1)).ravel())
+                elif not self.incremental:
+                    self.factorization = solver.Factorization(a)
+                elif isinstance(self.factorization, solver.UpdatableFactorization):
+                    self.factorization.update(a)
+                    self.stats.count('factorizationUpdates')
+                else:
+                    self.factorization = solver.UpdatableFactorization(a)
+        except np.linalg.LinAlgError:
+            self.factorization = None
+            self.factorizationKey = None
+            raise
+
+        self.factorizationKey = key
+        self.unknowns = unknowns
+        self.stats.count('factorizations')
+        if self.stats.enabled:
+            self.recordMatrixStats('equations', a, self.factorization)
+        return self.factorization
+
+    def recordMatrixStats(self, name, a, factorization):
+        """ Records the size, number of nonzeros and estimated condition number of a factored
+            matrix in self.stats. Costs a few extra solves, so only done while stats are enabled.
+        """
+        self.stats.record(name + 'Size', a.shape[0])
+        self.stats.record(name + 'Nonzeros', int(a.nnz) if solver.isSparse(a) else int(np.count_nonzero(a)))
+        with self.stats.phase('conditionEstimate'):
+            self.stats.record(name + 'Condition', solver.conditionEstimate(a, factorization))
+
+    def getLoadVector(self):
+        """ Returns the constants of the equations: minus the external load at every joint """
+        return -self.store.loads.ravel()
+
+    def setGeometryChanged(self, topologyChanged=True):
+        """ Called whenever joints, members or supports change, rather than just the loads.
+            Invalidates the cached factorization as well as the solution, and the rigidity
+            diagnosis unless only the location of joints changed.
+        """
+        self.geometryVersion += 1
+        if topologyChanged:
+            self.topologyVersion += 1
+        self.setUnsolved()
+
+    def diagnose(self):
+        """
+        Returns a RigidityDiagnosis of the truss: whether its members form a rigid body, which
+        members are redundant, which joints are under-braced and whether the supports restrain
+        it. Uses the pebble game, so no linear algebra is involved.
+        """
+        if self.diagnosisVersion != self.topologyVersion:
+            self.diagnosis = rigidity.diagnose(self)
+            self.diagnosisVersion = self.topologyVersion
+        elif self.diagnosisGeometry != self.geometryVersion:
+            # The supports may have been moved into line with each other
+            self.diagnosis.supportsValid = rigidity.supportsRestrain(self)
+            self.diagnosis.jointMethodSupports = rigidity.hasJointMethodSupports(self)
+            self.diagnosis.isSingular = False
+        self.diagnosisGeometry = self.geometryVersion
+
+        return self.diagnosis
+
+    def setLoadCase(self, name, loads):
+        """
+        Stores a named load case for use with analyzeLoadCases. The loads are either a dictionary
+        mapping joints to (loadX, loadY) or a (J x 2) array in the order of self.joints. Loads set
+        with addExternalLoad/setExternalLoad are not affected.
+        """
+        if isinstance(loads, dict):
+            self.loadCases[name] = dict(loads)
+        else:
+            loads = np.asarray(loads, dtype=float).reshape(len(self.joints), 2)
+            self.loadCases[name] = dict((joint, tuple(load)) for joint, load in zip(self.joints, loads) if load.any())
+
+    def deleteLoadCase(self, name):
+        if name in self.loadCases:
+            del self.loadCases[name]
+
+    def getLoadCaseNames(self):
+        return list(self.loadCases)
+
+    def analyzeLoadCases(self, loads=None, names=None, sparse=True):
+        """
+        Solves the truss under many load cases at once. The equations are assembled and factored
+        a single time and every load case is then back-substituted in one batched solve.
+
+        Parameters:
+            loads - (J x 2 x K) array where loads[i,:,k] is the load on self.joints[i] in case k.
+                    If None, the named load cases stored with setLoadCase are used.
+            names - names for the K cases, defaults to their position
+
+        Returns a LoadCaseSolution, or None if the equations cannot be solved. The single case
+        solution in self.forces is left untouched.
+        """
+        if loads is None:
+            names = self.getLoadCaseNames()
+            rhs = np.zeros((2*len(self.joints), len(names)))
+            for k, name in enumerate(names):
+                for joint, (loadX, loadY) in self.loadCases[name].items():
+                    rhs[2*joint.index, k] = -loadX
+                    rhs[2*joint.index+1, k] = -loadY
+        else:
+            loads = np.asarray(loads, dtype=float)
+            if loads.ndim == 2:
+                loads = loads[:,:,np.newaxis]
+            if names is None:
+                names = range(loads.shape[2])
+
+            # Rows of the equations follow the backing store, not the order of self.joints
+            rows = np.array([joint.index for joint in self.joints], dtype=int)
+            rhs = np.zeros((2*len(self.joints), loads.shape[2]))
+            rhs[2*rows] = -loads[:,0,:]
+            rhs[2*rows+1] = -loads[:,1,:]
+
+        self.stats.count('analyzeLoadCases')
+        try:
+            factorization = self.getFactorization(sparse=sparse)
+            with self.stats.phase('solve'):
+                x = factorization.solve(rhs)
+        except np.linalg.LinAlgError:
+            return None
+
+        x = x.reshape(len(self.unknowns), -1)
+        order = np.array([member.index for member in self.members], dtype=int)
+        return LoadCaseSolution(names, self.members, x[order], x[-3:])
+
+    def analyzeVariants(self, coords, chunkSize=256):
+        """
+        Solves variants of this truss that keep its members, supports and loads but move its
+        joints. coords is an (N x J x 2) array of joint coordinates in the order of self.joints.
+        The truss itself is not modified.
+
+        Returns (memberForces, reactions) as (N x M) and (N x 3) arrays, see variants.analyzeVariants.
+        Like analyze, this needs exactly one fixed joint and one roller. Otherwise every variant
+        is unsolved and comes back as NaN.
+        """
+        supports = self.getSupports()
+        fixed = [joint for joint, angle in supports if angle is None]
+        rollers = [(joint, angle) for joint, angle in supports if angle is not None]
+        if len(fixed) != 1 or len(rollers) != 1:
+            numVariants = np.shape(coords)[0]
+            return np.full((numVariants, len(self.members)), np.nan), np.full((numVariants, 3), np.nan)
+
+        position = dict((joint, i) for i, joint in enumerate(self.joints))
+        memberJoints = [(position[member.startJoint], position[member.endJoint]) for member in self.members]
+        loads = [joint.getLoad() for joint in self.joints]
+        fixedJoint = fixed[0]
+        rollerJoint, rollerAngle = rollers[0]
+
+        return variants.analyzeVariants(coords, memberJoints, position[fixedJoint], position[rollerJoint],
+                                        loads, rollerAngle, chunkSize)
+
+    def getInfluenceMatrix(self, sparse=True):
+        """
+        Returns the influence matrix of the truss: the member forces and reactions produced by a
+        unit load in the X and in the Y direction at every joint. Row i is self.members[i], and
+        the last three rows are the "roller", "fixedX" and "fixedY" reactions. Column 2j is a unit
+        X load at self.joints[j] and column 2j+1 a unit Y load.
+
+        All 2J columns come from one factorization and the matrix is cached until the geometry
+        of the truss changes. It is dense, (M+3) x 2J, so mind memory on very large trusses.
+        Returns None if the equations cannot be solved.
+        """
+        if self.influenceVersion == self.geometryVersion:
+            return self.influenceMatrix
+
+        try:
+            factorization = self.getFactorization(sparse=sparse)
+        except np.linalg.LinAlgError:
+            return None
+
+        # A unit load appears as -1 in the constants of its equation
+        x = factorization.solve(-np.eye(2*len(self.joints)))
+        x = x.reshape(len(self.unknowns), -1)
+
+        rows = [member.index for member in self.members] + [-3, -2, -1]
+        jointRows = np.array([joint.index for joint in self.joints], dtype=int)
+        cols = np.empty(2*len(jointRows), dtype=int)
+        cols[0::2] = 2*jointRows
+        cols[1::2] = 2*jointRows + 1
+
+        self.influenceMatrix = x[np.ix_(rows, cols)]
+        self.influenceVersion = self.geometryVersion
+        return self.influenceMatrix
+
+    def getInfluenceForces(self, loads):
+        """
+        Returns the member forces and reactions (as a dictionary in the same form as self.forces)
+        for the loads given as a (J x 2) array in the order of self.joints, using the influence
+        matrix instead of solving the equations again.
+        """
+        influence = self.getInfluenceMatrix()
+        if influence is None:
+            return None
+
+        x = influence.dot(np.asarray(loads, dtype=float).ravel())
+        forces = dict(zip(self.members, x))
+        forces.update(zip(("roller", "fixedX", "fixedY"), x[-3:]))
+        return forces
+
+    def getBottomChord(self, tolerance=1e-6):
+        """ Returns the lowest joints of the truss sorted from left to right """
+        if not self.joints:
+            return []
+
+        lowest = min(joint.getY() for joint in self.joints)
+        chord = [joint for joint in self.joints if joint.getY() - lowest <= tolerance]
+        return sorted(chord, key=lambda joint: joint.getX())
+
+    def getInfluenceLine(self, key, joints=None, load=(0.0, -1.0)):
+        """
+        Returns the influence line of a member (or of "roller", "fixedX" or "fixedY"): its force
+        as a load moves from joint to joint.
+
+        Parameters:
+            key    - the member or reaction of interest
+            joints - the path of the moving load, the bottom chord by default
+            load   - the moving load, a unit downward load by default
+
+        Returns (joints, values) where values[i] is the force with the load at joints[i].
+        """
+        if joints is None:
+            joints = self.getBottomChord()
+
+        influence = self.getInfluenceMatrix()
+        if influence is None:
+            return joints, None
+
+        if key in ("roller", "fixedX", "fixedY"):
+            row = influence[("roller", "fixedX", "fixedY").index(key) - 3]
+        else:
+            position = dict((member, i) for i, member in enumerate(self.members))
+            row = influence[position[key]]
+
+        position = dict((joint, i) for i, joint in enumerate(self.joints))
+        cols = np.array([2*position[joint] for joint in joints], dtype=int)
+        values = load[0]*row[cols] + load[1]*row[cols+1]
+        return joints, values
+
     def setSolved(self):
         """ Handles all the details after the truss has been successfully analyzed
             This involves setting the force in each member and setting the fixed forces
@@ -458,50 +1159,75 @@ class Truss(object):
             previous solution invalid. Changes the isSolved flag, clears the forces dictionary
             and sets the force in each member to None. 
         """
+        self.stateVersion += 1
         if self.isSolved:
             self.isSolved = False
             self.forces = {}
+            self.stiffnessSolution = None
             for member in self.members:
                 member.force = None     # None can be interpreted as unknown
 
 
-    def getNearbyJoint(self, x, y, rng=2):
-        """ Returns a joint that is within a certain range of (x,y)
-        """
-        for joint in self.joints:
-            if joint.getX() < x + rng and \
-               joint.getX() > x - rng and \
-               joint.getY() < y + rng and \
-               joint.getY() > y - rng:
+    def getJointsInRegion(self, x1, y1, x2, y2):
+        """ Returns the joints inside the rectangle from (x1,y1) to (x2,y2) """
+        proxies = self.store.jointProxies
+        return [proxies[i] for i in self.store.jointsInBox(x1, y1, x2, y2).tolist()]
 
-                return joint
+    def getMembersInRegion(self, x1, y1, x2, y2):
+        """ Returns the members that may cross the rectangle from (x1,y1) to (x2,y2), those whose
+            bounding boxes overlap it """
+        proxies = self.store.memberProxies
+        return [proxies[i] for i in self.store.membersInBox(x1, y1, x2, y2).tolist()]
 
-        return None
+    def getNearbyJoint(self, x, y, rng=2):
+        """ Returns the joint closest to (x,y) among those within a certain range of it
+        """
+        nearest = None
+        nearestDistance = None
+        for joint in self.jointIndex.query(x, y, rng):
+            dx = joint.getX() - x
+            dy = joint.getY() - y
+            if abs(dx) < rng and abs(dy) < rng:
+                distance = dx**2 + dy**2
+                if nearest is None or distance < nearestDistance:
+                    nearest = joint
+                    nearestDistance = distance
+
+        return nearest
 
     def getNearbyMember(self, x, y, rng=10):
-        for member in self.members:
+        """ Returns the member closest to (x,y) among those within a certain range of it. The
+            distance is measured vertically for mostly horizontal members and horizontally for
+            mostly vertical ones.
+        """
+        nearest = None
+        nearestDistance = rng
+        for member in self.memberIndex.query(x, y, rng):
             startX,startY,endX,endY = member.getCoords()
-
-            if abs(member.getDX()) > abs(member.getDY()):
-                if x > min(startX,endX) and x < max(startX,endX):
-                    if member.getDX() != 0:
-                        slope = member.getDY() / member.getDX()
-                    else:
-                        slope = 0
-                    if y < startY + slope*(x - startX) + rng and \
-                       y > startY + slope*(x - startX) - rng:
-                        return member
+            dx, dy, length = member.getGeometry()
+
+            if abs(dx) > abs(dy):
+                if not (x > min(startX,endX) and x < max(startX,endX)):
+                    continue
+                if dx != 0:
+                    slope = dy / dx
+                else:
+                    slope = 0
+                distance = abs(y - (startY + slope*(x - startX)))
             else:
-                if y > min(startY,endY) and y < max(startY,endY):
-                    if member.getDY() != 0:
-                        slope = member.getDX() / member.getDY()
-                    else:
-                        slope = 0
-                    if x < startX + slope*(y - startY) + rng and \
-                       x > startX + slope*(y - startY) - rng:
-                        return member
-
-        return None
+                if not (y > min(startY,endY) and y < max(startY,endY)):
+                    continue
+                if dy != 0:
+                    slope = dx / dy
+                else:
+                    slope = 0
+                distance = abs(x - (startX + slope*(y - startY)))
+
+            if distance < nearestDistance:
+                nearest = member
+                nearestDistance = distance
+
+        return nearest
         
     def getMembers(self):
         return self.members
@@ -509,6 +1235,14 @@ class Truss(object):
     def getJoints(self):
         return self.joints
 
+    def getJoint(self, uid):
+        """ Returns the joint with the given uid, or None """
+        return self.joints.get(uid)
+
+    def getMember(self, uid):
+        """ Returns the member with the given uid, or None """
+        return self.members.get(uid)
+
     def getForce(self,key):
         return self.forces[key]
         # If key is not in self.forces, raise Error
@@ -529,29 +1263,113 @@ class Truss(object):
         else:
             return False
 
-    def save(self,filename):
-        #Encode the truss in the bare essentials. Location of nodes and which nodes are connected
-        abstractTruss = {'nodes': {}, 'edges': [], 'fixed joint': "", 'roller joint': "", 'loads':{} }
-        
-        for joint in self.joints:
-            abstractTruss['nodes'][joint.id] = joint.getLoc()
-            if joint.forcesX["constant"] or joint.forcesY["constant"]:
-                abstractTruss['loads'][joint.id] = (joint.forcesX['constant'],joint.forcesY['constant'])
-                
-        for member in self.members:
-            abstractTruss['edges'].append(str(member))
-
-        if self.fixedJoint:
-            abstractTruss['fixed joint'] = self.fixedJoint.id
-
-        if self.rollerJoint:
-            abstractTruss['roller joint'] = self.rollerJoint.id
-
-        
+    def save(self, filename, compress=False):
+        """
+        Writes the coordinates, members, supports, loads and member stiffnesses of the truss to
+        a binary truss file (see trussfile) that loadTruss reads back. Joints and members are
+        written in the order they were added. Compressed files are smaller but cannot be memory
+        mapped when they are loaded.
+        """
+        trussfile.writeTrussFile(filename, self.getSnapshot(), compress=compress)
 
-        saveFile = open(filename,'wb')
-        pickle.dump(abstractTruss, saveFile)
-        saveFile.close()
+    def getSnapshot(self, storeOrder=False):
+        """
+        Returns a copy of the coordinates, members, supports, loads and member stiffnesses of
+        the truss as a trussfile.TrussFile, which shares no memory with the truss and so can be
+        handed to another thread. Joints and members come in the order they were added or, with
+        storeOrder, in the order of the rows of the backing store. Building a truss from the
+        latter (see trussFromFile) gives a copy whose store rows match this truss's.
+        """
+        if storeOrder:
+            jointRows = np.arange(self.store.numJoints)
+            memberRows = np.arange(self.store.numMembers)
+        else:
+            jointRows = np.array([joint.index for joint in self.joints], dtype=int)
+            memberRows = np.array([member.index for member in self.members], dtype=int)
+
+        # Rows of the store to rows of the copy
+        position = np.zeros(self.store.numJoints, dtype=int)
+        position[jointRows] = np.arange(len(jointRows))
+
+        return trussfile.TrussFile(coords=self.store.coords[jointRows],
+                                   loads=self.store.loads[jointRows],
+                                   memberJoints=position[self.store.memberJoints[memberRows]],
+                                   memberEA=self.store.memberEA[memberRows],
+                                   fixedJoints=position[[joint.index for joint in self.fixedJoints]],
+                                   rollerJoints=position[[joint.index for joint in self.rollerJoints]],
+                                   rollerAngles=[joint.rollerAngle - 90 for joint in self.rollerJoints],
+                                   name=self.name)
+
+
+def loadTruss(filename, incremental=False):
+    """
+    Rebuilds a truss from a file written by Truss.save, without any graphics. Files pickled by
+    older versions are read as well. Joints are relabeled in the order they are added, so their
+    ids may differ from those in older files.
+    """
+    if trussfile.isTrussFile(filename):
+        return trussFromFile(trussfile.readTrussFile(filename), incremental)
+
+    loadFile = open(filename,mode='rb')
+    abstractTruss = pickle.load(loadFile)
+    loadFile.close()
+
+    jointIDs = list(abstractTruss['nodes'])
+    position = dict((jointID, i) for i, jointID in enumerate(jointIDs))
+    loads = np.zeros((len(jointIDs), 2))
+    for jointID in abstractTruss['loads']:
+        loads[position[jointID]] = abstractTruss['loads'][jointID]
+
+    # Edges are (start id, end id) pairs. Older files store them as two letter strings, which
+    # unpack the same way. Repeated edges were ignored when the truss was built, so skip them.
+    stiffnesses = abstractTruss.get('member EA', [])
+    memberJoints = []
+    memberEA = []
+    connected = set()
+    for i, (startJointID, endJointID) in enumerate(abstractTruss['edges']):
+        start, end = position[startJointID], position[endJointID]
+        if start != end and (start, end) not in connected:
+            connected.update(((start, end), (end, start)))
+            memberJoints.append((start, end))
+            memberEA.append(stiffnesses[i] if i < len(stiffnesses) else 1.0)
+
+    # Files from before trusses could have several supports only have the single ones
+    if 'fixed joints' in abstractTruss:
+        fixedJoints = [position[jointID] for jointID in abstractTruss['fixed joints']]
+        rollers = [(position[jointID], angle) for jointID, angle in abstractTruss['roller joints']]
+    else:
+        fixedJoints = [position[abstractTruss['fixed joint']]] if abstractTruss['fixed joint'] else []
+        rollers = [(position[abstractTruss['roller joint']], 0)] if abstractTruss['roller joint'] else []
+
+    return buildTruss([abstractTruss['nodes'][jointID] for jointID in jointIDs], memberJoints,
+                      fixedJoints, [i for i, angle in rollers], [angle for i, angle in rollers],
+                      loads, memberEA, incremental=incremental)
+
+
+def trussFromFile(data, incremental=False):
+    """ Builds a Truss from the arrays of a trussfile.TrussFile """
+    return buildTruss(data.coords, data.memberJoints, data.fixedJoints, data.rollerJoints, data.rollerAngles,
+                      data.loads, data.memberEA, str(data.name), incremental)
+
+
+def buildTruss(coords, memberJoints, fixedJoints=(), rollerJoints=(), rollerAngles=None, loads=None,
+               memberEA=None, name="", incremental=False):
+    """
+    Builds a whole Truss from arrays in one pass, see Truss.addArrays. fixedJoints and
+    rollerJoints are rows of coords, and rollerAngles the angle of the surface under each
+    roller (level by default).
+    """
+    truss = Truss(name, incremental=incremental)
+    joints, members = truss.addArrays(coords, memberJoints, loads, memberEA)
+
+    if rollerAngles is None:
+        rollerAngles = [0] * len(rollerJoints)
+    for i in np.asarray(fixedJoints, dtype=int).tolist():
+        truss.markFixedJoint(joints[i])
+    for i, angleOfSurface in zip(np.asarray(rollerJoints, dtype=int).tolist(), np.asarray(rollerAngles, dtype=float).tolist()):
+        truss.markRollerJoint(joints[i], angleOfSurface)
+
+    return truss
         
 
 def main():
@@ -2,22 +2,37 @@
 from helperfunctions import *
 from truss import *
 from tkinter import *
+from tkinter import filedialog
+import logging
+import sys
 from constants import *
 from designspace import DesignSpace
 from graphics import *
-import pickle
+from backgroundsolver import BackgroundSolver
+import profiling
 
 class App:
-    def __init__(self, master):
+    def __init__(self, master, stats=False):
         """
         This is the highest class in the hierarchy. It maintains a reference to the
         main data structure that this GUI is manipulating. All other classes keep a reference to
         their parent and can access the Truss via this class.
+
+        With stats=True the timings of every solve and redraw are logged, see Truss.stats.
         """
         self.master = master
+        self.stats = stats
         
         # Instantiate data structure
-        self.truss = Truss()
+        self.setTruss(Truss(incremental=True))
+
+        # Solves run on a worker thread against snapshots of the truss, see solveTruss
+        solverStats = None
+        if stats:
+            solverStats = profiling.AnalysisStats("background")
+            solverStats.enable(log=True)
+        self.solver = BackgroundSolver(solverStats)
+        self.isPolling = False
 
         # Graphics
         self.frame = Frame(master,width=WINDOW_WIDTH,height=WINDOW_HEIGHT)
@@ -33,11 +48,16 @@ class App:
         self.frame.pack()
 
         # Event Binding
-        root.bind("<Control-g>",self.designSpace.toggleSnap)
+        self.master.bind("<Control-g>",self.designSpace.toggleSnap)
 
         # Current filename
         self.fileName = None
         
+    def setTruss(self, truss):
+        self.truss = truss
+        if self.stats:
+            truss.stats.enable(log=True)
+
     def addMember(self,joint1,joint2):
         self.truss.addMember(joint1,joint2)
 
@@ -45,7 +65,7 @@ class App:
         pass
 
     def clearTruss(self):
-        self.truss = Truss()
+        self.setTruss(Truss(incremental=True))
         self.designSpace.clear()
 
     def reanalyzeTruss(self):
@@ -54,24 +74,67 @@ class App:
         self.solveTruss()
 
     def solveTruss(self):
-        if not self.truss.isSolved and self.truss.isDeterminate():
-            self.truss.analyze()
+        """ Hands a snapshot of the truss to the background solver and returns straight away.
+            The solution is drawn by pollSolver when it arrives, unless the truss has changed
+            again by then, in which case a newer snapshot is already on its way.
+        """
+        if self.truss.isSolved:
+            return
+        if not (self.truss.isDeterminate() or self.truss.getSupports()):
+            # Nothing is coming to replace any forces still on display
             self.updateTrussSolution()
+            return
+
+        self.solver.submit(self.truss.getSnapshot(storeOrder=True), (self.truss, self.truss.stateVersion))
+        if not self.isPolling:
+            self.isPolling = True
+            self.designSpace.statusBar.setTempText("  Solving...")
+            self.master.after(SOLVER_POLL_INTERVAL,self.pollSolver)
+
+    def pollSolver(self):
+        # Whether the solver was idle must be known before taking its result, see isIdle
+        idle = self.solver.isIdle()
+        result = self.solver.getResult()
+        if result is not None and result.tag == (self.truss, self.truss.stateVersion):
+            if result.solved:
+                self.truss.setSolution(result.memberForces, result.reactions, result.displacements)
+            # An unsolved result clears the forces left on display during a drag
+            self.updateTrussSolution()
+
+        if idle:
+            self.isPolling = False
+            self.designSpace.statusBar.update()
+        else:
+            self.master.after(SOLVER_POLL_INTERVAL,self.pollSolver)
+
+    def analyzeTruss(self):
+        """ Solves the truss on this thread without touching its graphics, as a file is loaded.
+            Returns whether it was solved. """
+        if self.truss.isDeterminate():
+            return self.truss.analyze()
+        elif self.truss.getSupports():
+            # Redundant members or supports, fall back on the stiffness method
+            return self.truss.analyzeStiffness()
+        return False
 
     def updateTrussSolution(self):
-            for member in self.truss.getMembers():
-                member.graphic.update()
+        """ Shows the forces of the truss as they are now. Only the items that would look
+            different are touched, see MemberGraphic.showForce, and members out of view have no
+            items: they are brought up to date once they come into view. """
+        with self.truss.stats.phase('redraw'):
+            redrawn = 0
+            for graphic in self.designSpace.view.getLive(MemberGraphic):
+                if graphic.showForce():
+                    redrawn += 1
+            self.truss.stats.count('redrawnMembers',redrawn)
 
 ##            for joint in self.truss.getJoints():
 ##                joint.graphic.update()
-            if self.truss.fixedJoint:
-                self.truss.fixedJoint.graphic.update()
-                
-            if self.truss.rollerJoint:
-                self.truss.rollerJoint.graphic.update()
+            for joint, angle in self.truss.getSupports():
+                joint.graphic.updateReactions()
 
     def saveas(self):
-        fileName = filedialog.asksaveasfilename(defaultextension='.txt',filetypes=[('Text Files', '.txt')])
+        fileName = filedialog.asksaveasfilename(defaultextension='.truss',filetypes=[('Truss Files', '.truss')])
         #print(fileName)
         if fileName:
             #print("yes filename")
@@ -99,59 +162,45 @@ class App:
         self.load()
 
     def load(self):
-        fileName = filedialog.askopenfilename(defaultextension='.txt',filetypes=[('Text Files','.txt')])
+        fileName = filedialog.askopenfilename(defaultextension='.truss',filetypes=[('Truss Files','.truss'),('Old Truss Files','.txt')])
         if fileName:
             print(fileName)
             self.fileName = fileName
-            loadFile = open(fileName,mode='rb')
-            abstractTruss = pickle.load(loadFile)
-            loadFile.close()
             self.clearTruss()
-            
-            generatedJoints = {}
-            for jointID in abstractTruss['nodes']:
-                x,y = abstractTruss['nodes'][jointID]
-                newJoint = self.truss.addJoint(x,y)
-                newJoint.graphic = JointGraphic(self.designSpace.canvas,newJoint)
-                newJoint.loadLine = None
-                generatedJoints[jointID] = newJoint
-
-            print(generatedJoints)
-
-            for memberID in abstractTruss['edges']:
-                startJointID,endJointID = memberID
-                startJoint = generatedJoints[startJointID]
-                endJoint = generatedJoints[endJointID]
-                newMember = self.truss.addMember(startJoint,endJoint)
-                newMember.graphic = MemberGraphic(self.designSpace.canvas,newMember)
-
-            if abstractTruss['fixed joint']:
-                self.designSpace.currentJoint = generatedJoints[abstractTruss['fixed joint']]
-                self.designSpace.selectFixedJoint()
-                
-            if abstractTruss['roller joint']:
-                self.designSpace.currentJoint = generatedJoints[abstractTruss['roller joint']]
-                self.designSpace.selectRollerJoint()
-
-            for jointID in abstractTruss['loads']:
-                joint = generatedJoints[jointID]
-                fx, fy = abstractTruss['loads'][jointID]
-                jx, jy = joint.getLoc()
-                cx, cy = rectifyPos((jx,jy),self.designSpace.canvas)
-                joint.loadLine = LoadGraphic(self.designSpace.canvas,\
-                                             joint,\
-                                             cx+fx/LOAD_SCALE_FACTOR,\
-                                             cy-fy/LOAD_SCALE_FACTOR)
-                joint.loadLine.makeInactive()
-                self.truss.setExternalLoad(joint,fx,fy)
-
-            
-            self.solveTruss()
-            for joint in self.truss.getJoints():
-                joint.graphic.update()
+            self.setTruss(loadTruss(fileName,incremental=True))
+
+            # Solve first so that every graphic is drawn once, already showing its forces.
+            # Members go below the joints.
+            self.analyzeTruss()
+            self.drawTruss()
 
             self.designSpace.mjCount.setText(" ("+str(len(self.truss.getJoints()))+" Joints / "+str(len(self.truss.getMembers()))+" Members)")
 
+    def drawTruss(self):
+        """ Creates the graphics of a truss that has just been loaded """
+        with self.truss.stats.phase('draw'):
+            canvas = self.designSpace.canvas
+            for member in self.truss.getMembers():
+                member.graphic = MemberGraphic(canvas,member)
+
+            for joint in self.truss.getJoints():
+                if joint.isFixed:
+                    joint.graphic = JointGraphic(canvas,joint,color=FIXED_JOINT_COLOR)
+                elif joint.isRoller:
+                    joint.graphic = JointGraphic(canvas,joint,color=ROLLER_JOINT_COLOR)
+                else:
+                    joint.graphic = JointGraphic(canvas,joint)
+
+                joint.loadLine = None
+                fx, fy = joint.getLoad()
+                if fx or fy:
+                    endX, endY = rectifyPos((joint.getX()+fx/LOAD_SCALE_FACTOR,joint.getY()+fy/LOAD_SCALE_FACTOR),canvas)
+                    joint.loadLine = LoadGraphic(canvas,\
+                                                 joint,\
+                                                 endX,\
+                                                 endY,\
+                                                 color=LOAD_COLOR)
+
 
 class Toolbar():
     def __init__(self,master):
@@ -199,8 +248,7 @@ class Toolbar():
 class TopMenu():
     def __init__(self,master):
         self.master = master
-        #menubar = Menu(master.master)
-        menubar = Menu(root)
+        menubar = Menu(master.master)
 
         # File Menu
         fileMenu = Menu(menubar,tearoff=0)
@@ -248,25 +296,44 @@ class TopMenu():
         gridMenu.add_command(label="Off",command=self.master.designSpace.eraseGrid)
 
         optionMenu.add_cascade(label="Grid",menu=gridMenu)
+
+        # View Menu
+        viewMenu = Menu(menubar,tearoff=0)
+        viewMenu.add_command(label="Zoom In",command=self.master.designSpace.zoomIn,accelerator="Ctrl-+")
+        viewMenu.add_command(label="Zoom Out",command=self.master.designSpace.zoomOut,accelerator="Ctrl--")
+        viewMenu.add_command(label="Fit Truss",command=self.master.designSpace.fitView)
+        viewMenu.add_command(label="Actual Size",command=self.master.designSpace.resetView,accelerator="Ctrl-0")
+
+        self.master.master.bind("<Control-plus>",self.master.designSpace.zoomIn)
+        self.master.master.bind("<Control-equal>",self.master.designSpace.zoomIn)
+        self.master.master.bind("<Control-minus>",self.master.designSpace.zoomOut)
+        self.master.master.bind("<Control-Key-0>",self.master.designSpace.resetView)
         
         
         menubar.add_cascade(label="File",menu=fileMenu)
         menubar.add_cascade(label="Edit",menu=editMenu)
+        menubar.add_cascade(label="View",menu=viewMenu)
         menubar.add_cascade(label="Options",menu=optionMenu)
 
         # Display Menu
-        #master.master.config(menu=menubar)
-        root.config(menu=menubar)
+        self.master.master.config(menu=menubar)
 
-root = Tk()
-root.minsize(width=WINDOW_WIDTH,height=WINDOW_HEIGHT)
-root.title("ULTRAS - Truss Design and Analysis")
-root.resizable(width=False,height=False)
+# The window is only created when the GUI is run, so the rest of the package can be imported
+# (and used from the command line, see trusscli.py) without a display
+if __name__ == "__main__":
+    root = Tk()
+    root.minsize(width=WINDOW_WIDTH,height=WINDOW_HEIGHT)
+    root.title("ULTRAS - Truss Design and Analysis")
+    root.resizable(width=False,height=False)
 
-app = App(root)
+    # --stats logs the time taken by each solve and redraw
+    stats = "--stats" in sys.argv[1:]
+    if stats:
+        logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+    app = App(root, stats=stats)
 
 
-root.mainloop()
+    root.mainloop()
         
 
         
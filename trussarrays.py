@@ -0,0 +1,234 @@
+# Array Backing Store for Trusses
+import numpy as np
+
+class TrussArrays(object):
+    """
+    Structure-of-arrays storage for the numeric state of a truss. Joint coordinates and loads
+    live in contiguous float64 arrays and member endpoints in an int32 array of joint indices,
+    so operations over the whole truss can be vectorized with NumPy. The axial stiffness (EA)
+    of each member is kept alongside its endpoints.
+
+    The vector between the joints of each member, its length and its direction cosines are
+    cached as well. Adding a member or moving one of its joints (see invalidateMembers) only
+    marks its row stale; stale rows are recomputed together, with NumPy, the next time any
+    member's geometry is asked for.
+
+    Joint and Member objects act as proxies that hold their index into these arrays. Removing
+    an element moves the last element into the freed slot and updates the index of the proxy
+    that moved, which keeps the live part of every array contiguous.
+    """
+    def __init__(self, capacity=16):
+        capacity = max(capacity, 1)
+        self._coords = np.zeros((capacity, 2))
+        self._loads = np.zeros((capacity, 2))
+        self._memberJoints = np.zeros((capacity, 2), dtype=np.int32)
+        self._memberEA = np.zeros(capacity)
+
+        # Geometry cache: vector from start to end joint, length and direction cosines
+        self._memberD = np.zeros((capacity, 2))
+        self._memberLength = np.zeros(capacity)
+        self._memberUnit = np.zeros((capacity, 2))
+        self._memberStale = np.zeros(capacity, dtype=bool)
+        self.anyStale = False
+
+        self.numJoints = 0
+        self.numMembers = 0
+
+        # Proxy objects, in the same order as the rows of the arrays
+        self.jointProxies = []
+        self.memberProxies = []
+
+    @property
+    def coords(self):
+        """ (J x 2) view of the joint coordinates """
+        return self._coords[:self.numJoints]
+
+    @property
+    def loads(self):
+        """ (J x 2) view of the external loads applied at each joint """
+        return self._loads[:self.numJoints]
+
+    @property
+    def memberJoints(self):
+        """ (M x 2) view of the start and end joint indices of each member """
+        return self._memberJoints[:self.numMembers]
+
+    @property
+    def memberEA(self):
+        """ (M) view of the axial stiffness of each member """
+        return self._memberEA[:self.numMembers]
+
+    def memberVectors(self):
+        """
+        Returns (d, length) where d is the (M x 2) array of vectors from the start joint to the
+        end joint of each member and length is the array of member lengths. These are views of
+        the geometry cache and must not be written to.
+        """
+        self.refreshMembers()
+        return self._memberD[:self.numMembers], self._memberLength[:self.numMembers]
+
+    def memberDirections(self):
+        """ Returns the (M x 2) direction cosines of the members, also a view of the cache """
+        self.refreshMembers()
+        return self._memberUnit[:self.numMembers]
+
+    def memberGeometry(self, index):
+        """ Returns (dx, dy, length) of a single member as floats """
+        if self.anyStale:
+            self.refreshMembers()
+        d = self._memberD
+        return d.item(index, 0), d.item(index, 1), self._memberLength.item(index)
+
+    def memberDirection(self, index):
+        """ Returns the direction cosines of a single member as floats, NaN if it has no length """
+        if self.anyStale:
+            self.refreshMembers()
+        unit = self._memberUnit
+        return unit.item(index, 0), unit.item(index, 1)
+
+    def invalidateMembers(self, indices):
+        """ Marks the cached geometry of members stale, after one of their joints has moved """
+        self._memberStale[indices] = True
+        self.anyStale = True
+
+    def refreshMembers(self):
+        """ Recomputes the geometry of every stale member at once """
+        if not self.anyStale:
+            return
+
+        stale = np.flatnonzero(self._memberStale[:self.numMembers])
+        joints = self._memberJoints[stale]
+        d = self._coords[joints[:,1]] - self._coords[joints[:,0]]
+        length = np.hypot(d[:,0], d[:,1])
+        self._memberD[stale] = d
+        self._memberLength[stale] = length
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self._memberUnit[stale] = d / length[:,np.newaxis]
+
+        self._memberStale[stale] = False
+        self.anyStale = False
+
+    def jointsInBox(self, x1, y1, x2, y2):
+        """ Returns the indices of the joints with x1 <= x <= x2 and y1 <= y <= y2 """
+        x, y = self.coords[:,0], self.coords[:,1]
+        return np.flatnonzero((x >= x1) & (x <= x2) & (y >= y1) & (y <= y2))
+
+    def membersInBox(self, x1, y1, x2, y2):
+        """ Returns the indices of the members whose bounding boxes overlap the box from (x1,y1)
+            to (x2,y2) """
+        start = self.coords[self.memberJoints[:,0]]
+        end = self.coords[self.memberJoints[:,1]]
+        low = np.minimum(start, end)
+        high = np.maximum(start, end)
+        return np.flatnonzero((high[:,0] >= x1) & (low[:,0] <= x2) & (high[:,1] >= y1) & (low[:,1] <= y2))
+
+    def addJoint(self, x, y, proxy=None):
+        """ Stores a new joint at (x,y) with no load and returns its index. """
+        if self.numJoints == len(self._coords):
+            self._coords = _grow(self._coords)
+            self._loads = _grow(self._loads)
+
+        index = self.numJoints
+        self._coords[index] = (x, y)
+        self._loads[index] = 0.0
+        self.jointProxies.append(proxy)
+        self.numJoints += 1
+        return index
+
+    def addJoints(self, coords, proxies):
+        """ Stores a (N x 2) array of joints with no loads at once and returns the index of the first """
+        coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        first = self.numJoints
+        last = first + len(coords)
+        while last > len(self._coords):
+            self._coords = _grow(self._coords)
+            self._loads = _grow(self._loads)
+
+        self._coords[first:last] = coords
+        self._loads[first:last] = 0.0
+        self.jointProxies.extend(proxies)
+        self.numJoints = last
+        return first
+
+    def removeJoint(self, index):
+        """ Removes a joint. Any members attached to it must have been removed first. """
+        last = self.numJoints - 1
+        if index != last:
+            self._coords[index] = self._coords[last]
+            self._loads[index] = self._loads[last]
+            moved = self.jointProxies[last]
+            self.jointProxies[index] = moved
+            if moved is not None:
+                moved.index = index
+                # Only the members of the moved joint refer to it
+                for member in moved.getMembers():
+                    if member.store is self:
+                        self._memberJoints[member.index][self._memberJoints[member.index] == last] = index
+            else:
+                self._memberJoints[:self.numMembers][self.memberJoints == last] = index
+
+        self.jointProxies.pop()
+        self.numJoints -= 1
+
+    def addMember(self, startIndex, endIndex, proxy=None, EA=1.0):
+        """ Stores a new member between two joint indices and returns its index. """
+        if self.numMembers == len(self._memberJoints):
+            self._growMembers()
+
+        index = self.numMembers
+        self._memberJoints[index] = (startIndex, endIndex)
+        self._memberEA[index] = EA
+        self._memberStale[index] = True
+        self.anyStale = True
+        self.memberProxies.append(proxy)
+        self.numMembers += 1
+        return index
+
+    def addMembers(self, memberJoints, proxies, EA=1.0):
+        """ Stores a (N x 2) array of members at once and returns the index of the first """
+        memberJoints = np.asarray(memberJoints).reshape(-1, 2)
+        first = self.numMembers
+        last = first + len(memberJoints)
+        while last > len(self._memberJoints):
+            self._growMembers()
+
+        self._memberJoints[first:last] = memberJoints
+        self._memberEA[first:last] = EA
+        self._memberStale[first:last] = True
+        self.anyStale = True
+        self.memberProxies.extend(proxies)
+        self.numMembers = last
+        return first
+
+    def removeMember(self, index):
+        last = self.numMembers - 1
+        if index != last:
+            self._memberJoints[index] = self._memberJoints[last]
+            self._memberEA[index] = self._memberEA[last]
+            self._memberD[index] = self._memberD[last]
+            self._memberLength[index] = self._memberLength[last]
+            self._memberUnit[index] = self._memberUnit[last]
+            self._memberStale[index] = self._memberStale[last]
+            moved = self.memberProxies[last]
+            self.memberProxies[index] = moved
+            if moved is not None:
+                moved.index = index
+
+        self._memberStale[last] = False
+        self.memberProxies.pop()
+        self.numMembers -= 1
+
+    def _growMembers(self):
+        self._memberJoints = _grow(self._memberJoints)
+        self._memberEA = _grow(self._memberEA)
+        self._memberD = _grow(self._memberD)
+        self._memberLength = _grow(self._memberLength)
+        self._memberUnit = _grow(self._memberUnit)
+        self._memberStale = _grow(self._memberStale)
+
+
+def _grow(array):
+    """ Returns a copy of array with twice as many rows. """
+    bigger = np.zeros((2*len(array),) + array.shape[1:], dtype=array.dtype)
+    bigger[:len(array)] = array
+    return bigger
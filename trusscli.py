@@ -0,0 +1,169 @@
+# Command Line Analysis of Saved Trusses
+import argparse
+import csv
+import json
+import sys
+
+"""
+Solves saved trusses without the GUI and prints or writes the forces in their members and
+the reactions at their supports, e.g.
+
+    python trusscli.py bridge.truss
+    python trusscli.py designs/ -f csv -o results.csv -j 0
+    python trusscli.py bridge.truss -l cases.json -p 3
+
+A load case file is a JSON object mapping the name of each case to the loads of that case,
+keyed by joint id:
+
+    {"dead": {"B": [0, -16.5], "C": [0, -16.5]}, "wind": {"E": [4, 0]}}
+
+Each case replaces the loads saved with the truss. The numeric modules are only imported
+once the arguments have been checked, so mistakes and --help are reported immediately.
+"""
+
+
+def readLoadCases(fileName):
+    """ Reads a load case file, raising ValueError if it does not have the expected shape """
+    with open(fileName) as loadCaseFile:
+        loadCases = json.load(loadCaseFile)
+
+    if not isinstance(loadCases, dict):
+        raise ValueError("%s must hold an object of load cases" % fileName)
+    for name, loads in loadCases.items():
+        if not isinstance(loads, dict) or not all(isLoadPair(load) for load in loads.values()):
+            raise ValueError("Load case %r must map joint ids to [loadX, loadY]" % name)
+
+    return loadCases
+
+
+def isLoadPair(load):
+    """ True if a load from a load case file is a pair of numbers """
+    return isinstance(load, (list, tuple)) and len(load) == 2 and \
+        all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in load)
+
+
+def roundFloats(value, precision):
+    """ Rounds every float in a structure of dictionaries and lists """
+    if isinstance(value, float):
+        return round(value, precision)
+    if isinstance(value, dict):
+        return dict((key, roundFloats(item, precision)) for key, item in value.items())
+    if isinstance(value, list):
+        return [roundFloats(item, precision) for item in value]
+    return value
+
+
+def solutions(result):
+    """ Yields (case name, forces, reactions) for a solved result, with None as the name when
+        there are no load cases """
+    if 'cases' in result:
+        for name, case in result['cases'].items():
+            yield name, case['forces'], case['reactions']
+    else:
+        yield None, result['forces'], result['reactions']
+
+
+def reactionItems(reactions):
+    """ Flattens reactions given as [X, Y] pairs into single values """
+    for key, value in reactions.items():
+        if isinstance(value, list):
+            yield key + "X", value[0]
+            yield key + "Y", value[1]
+        else:
+            yield key, value
+
+
+class TextWriter(object):
+    """ Writes each solution as a readable table, like Truss.displaySolution """
+    def __init__(self, precision):
+        self.precision = precision
+
+    def __call__(self, result, output):
+        if not result['solved']:
+            output.write("%s: not solved (%s)\n\n" % (result['file'], result.get('error') or result.get('diagnosis')))
+            return
+
+        output.write("%s: %d joints, %d members\n" % (result['file'], result['joints'], result['members']))
+        for name, forces, reactions in solutions(result):
+            indent = "  "
+            if name is not None:
+                output.write("  Load case %s\n" % name)
+                indent = "    "
+            for key, value in list(forces.items()) + list(reactionItems(reactions)):
+                output.write("%s%s -> %.*f\n" % (indent, key.ljust(10), self.precision, value))
+        output.write('\n')
+
+
+class JSONWriter(object):
+    """ Writes one JSON object per line and file, as the batch runner does """
+    def __init__(self, precision):
+        self.precision = precision
+
+    def __call__(self, result, output):
+        output.write(json.dumps(roundFloats(result, self.precision)) + '\n')
+
+
+class CSVWriter(object):
+    """ Writes one file,case,name,value row per force and reaction. Unsolved files get a
+        single row with their error or diagnosis as the value. """
+    def __init__(self, precision):
+        self.precision = precision
+        self.writer = None
+
+    def __call__(self, result, output):
+        if self.writer is None:
+            self.writer = csv.writer(output, lineterminator='\n')
+            self.writer.writerow(("file", "case", "name", "value"))
+
+        if not result['solved']:
+            self.writer.writerow((result['file'], "", "unsolved", result.get('error') or result.get('diagnosis')))
+            return
+
+        for name, forces, reactions in solutions(result):
+            for key, value in list(forces.items()) + list(reactionItems(reactions)):
+                self.writer.writerow((result['file'], "" if name is None else name, key, "%.*f" % (self.precision, value)))
+
+
+WRITERS = {'text': TextWriter, 'json': JSONWriter, 'csv': CSVWriter}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve saved trusses and report member forces and support reactions.")
+    parser.add_argument('paths', nargs='+', help="truss files or directories containing them")
+    parser.add_argument('-l', '--load-cases', help="JSON file of named load cases to solve each truss for")
+    parser.add_argument('-p', '--precision', type=int, default=2, help="decimal places of forces (default: 2)")
+    parser.add_argument('-f', '--format', choices=sorted(WRITERS), default='text', help="output format (default: text)")
+    parser.add_argument('-o', '--output', help="file to write results to (default: standard output)")
+    parser.add_argument('-j', '--workers', type=int, default=1, help="worker processes, 0 for one per core (default: 1)")
+    parser.add_argument('-c', '--chunk-size', type=int, default=16, help="files handed to a worker at a time")
+    parser.add_argument('--pattern', default="*.truss,*.txt", help="comma separated file name patterns used inside directories")
+    args = parser.parse_args(argv)
+
+    if args.workers < 0 or args.chunk_size < 1:
+        parser.error("the number of workers and the chunk size must be positive")
+
+    try:
+        loadCases = readLoadCases(args.load_cases) if args.load_cases else None
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+
+    import batchrunner
+    fileNames = batchrunner.findTrussFiles(args.paths, args.pattern)
+    if not fileNames:
+        parser.error("no truss files found")
+
+    output = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        numSolved = batchrunner.runBatch(fileNames, output, args.workers or None, args.chunk_size,
+                                         loadCases, WRITERS[args.format](args.precision), ordered=True)
+    finally:
+        if args.output:
+            output.close()
+
+    if len(fileNames) > 1:
+        sys.stderr.write("Solved %d of %d trusses\n" % (numSolved, len(fileNames)))
+    return 0 if numSolved == len(fileNames) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
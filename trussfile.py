@@ -0,0 +1,140 @@
+# Binary Truss Files
+import zipfile
+import numpy as np
+
+"""
+A truss file is a NumPy .npz archive (a zip of .npy arrays), optionally compressed:
+
+    version      - format version, a single int32
+    name         - name of the truss
+    coords       - (J x 2) float64 joint coordinates
+    loads        - (J x 2) float64 external load on each joint
+    memberJoints - (M x 2) int32 start and end joint of each member, as rows of coords
+    memberEA     - (M) float64 axial stiffness of each member
+    fixedJoints  - (F) int32 fixed joints
+    rollerJoints - (R) int32 roller joints
+    rollerAngles - (R) float64 angle of the surface under each roller, in degrees
+
+Readers must reject versions newer than they know and may ignore arrays they do not.
+"""
+FORMAT_VERSION = 1
+
+ARRAY_NAMES = ('coords', 'loads', 'memberJoints', 'memberEA', 'fixedJoints', 'rollerJoints', 'rollerAngles')
+
+
+class TrussFile(object):
+    """
+    Contents of a truss file as arrays, see readTrussFile. No joint or member objects are
+    created, so large files can be inspected or solved without building a Truss.
+    """
+    def __init__(self, coords, loads, memberJoints, memberEA, fixedJoints, rollerJoints, rollerAngles,
+                 name="", version=FORMAT_VERSION):
+        self.version = version
+        self.name = name
+        self.coords = coords
+        self.loads = loads
+        self.memberJoints = memberJoints
+        self.memberEA = memberEA
+        self.fixedJoints = fixedJoints
+        self.rollerJoints = rollerJoints
+        self.rollerAngles = rollerAngles
+
+    @property
+    def numJoints(self):
+        return len(self.coords)
+
+    @property
+    def numMembers(self):
+        return len(self.memberJoints)
+
+
+def isTrussFile(filename):
+    """ Tells files written by writeTrussFile apart from the older pickled ones """
+    return zipfile.is_zipfile(filename)
+
+
+""" -------------------------------------------------------------------
+    writeTrussFile
+    -------------------------------------------------------------------
+    filename - path of the file to write, used as given (np.savez would
+               add .npz to it)
+    data     - TrussFile holding the arrays to write
+    compress - deflate the arrays. Smaller, but the file can no longer be
+               memory mapped when it is read.
+"""
+def writeTrussFile(filename, data, compress=False):
+    arrays = {
+        'version': np.int32(FORMAT_VERSION),
+        'name': np.array(data.name),
+        'coords': np.asarray(data.coords, dtype=np.float64).reshape(-1, 2),
+        'loads': np.asarray(data.loads, dtype=np.float64).reshape(-1, 2),
+        'memberJoints': np.asarray(data.memberJoints, dtype=np.int32).reshape(-1, 2),
+        'memberEA': np.asarray(data.memberEA, dtype=np.float64),
+        'fixedJoints': np.asarray(data.fixedJoints, dtype=np.int32),
+        'rollerJoints': np.asarray(data.rollerJoints, dtype=np.int32),
+        'rollerAngles': np.asarray(data.rollerAngles, dtype=np.float64),
+    }
+
+    with open(filename, 'wb') as saveFile:
+        if compress:
+            np.savez_compressed(saveFile, **arrays)
+        else:
+            np.savez(saveFile, **arrays)
+
+
+""" -------------------------------------------------------------------
+    readTrussFile
+    -------------------------------------------------------------------
+    filename - path of a file written by writeTrussFile
+    mmap     - memory map the arrays of uncompressed files instead of
+               reading them, so opening a file costs the same whatever
+               its size and only the pages that are used are ever read
+
+    Returns a TrussFile. Memory mapped arrays are read only. Raises
+    ValueError if the file is from a newer version of the format.
+"""
+def readTrussFile(filename, mmap=True):
+    with open(filename, 'rb') as loadFile, zipfile.ZipFile(loadFile) as archive:
+        version = int(_readMember(archive, 'version'))
+        if version > FORMAT_VERSION:
+            raise ValueError("%s uses truss file version %d, only versions up to %d can be read" % \
+                             (filename, version, FORMAT_VERSION))
+
+        arrays = {}
+        for key in ARRAY_NAMES:
+            info = archive.getinfo(key + '.npy')
+            if mmap and info.compress_type == zipfile.ZIP_STORED:
+                arrays[key] = _mapMember(filename, loadFile, info)
+            else:
+                arrays[key] = _readMember(archive, key)
+
+        return TrussFile(name=str(_readMember(archive, 'name')), version=version, **arrays)
+
+
+def _readMember(archive, key):
+    with archive.open(key + '.npy') as member:
+        return np.lib.format.read_array(member, allow_pickle=False)
+
+
+def _mapMember(filename, loadFile, info):
+    """ Memory maps an uncompressed .npy member of a zip file where it lies in the file """
+    # The data follows the member's local header, whose name and extra fields vary in length
+    loadFile.seek(info.header_offset)
+    header = loadFile.read(30)
+    if header[:4] != b'PK\x03\x04':
+        raise ValueError("%s is not a valid truss file" % filename)
+    nameLength = int.from_bytes(header[26:28], 'little')
+    extraLength = int.from_bytes(header[28:30], 'little')
+    loadFile.seek(info.header_offset + 30 + nameLength + extraLength)
+
+    if np.lib.format.read_magic(loadFile) == (1, 0):
+        shape, fortranOrder, dtype = np.lib.format.read_array_header_1_0(loadFile)
+    else:
+        shape, fortranOrder, dtype = np.lib.format.read_array_header_2_0(loadFile)
+    if dtype.hasobject:
+        raise ValueError("%s is not a valid truss file" % filename)
+    if not np.prod(shape, dtype=int):
+        return np.zeros(shape, dtype=dtype)
+
+    return np.memmap(filename, dtype=dtype, mode='r', offset=loadFile.tell(), shape=shape,
+                     order='F' if fortranOrder else 'C')
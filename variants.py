@@ -0,0 +1,78 @@
+# Batched Analysis of Geometry Variants
+import numpy as np
+
+""" -------------------------------------------------------------------
+    analyzeVariants
+    -------------------------------------------------------------------
+    Solves many trusses that share one topology but differ in the
+    coordinates of their joints, e.g. the candidates of a shape study.
+    The method of joints equations of all variants are built at once
+    with NumPy and solved with one stacked np.linalg.solve per chunk.
+
+    coords       - (N x J x 2) joint coordinates of the N variants
+    memberJoints - (M x 2) start and end joint index of each member
+    fixedJoint   - index of the fixed (pinned) joint
+    rollerJoint  - index of the roller joint
+    loads        - (J x 2) external loads shared by every variant, or
+                   (N x J x 2) loads for each variant
+    rollerAngle  - direction of the roller reaction in degrees, 90 for
+                   a roller on a horizontal surface (see Joint.makeRoller)
+    chunkSize    - number of variants solved together. Each chunk holds
+                   chunkSize (2J x 2J) matrices, which bounds the memory.
+
+    Returns (memberForces, reactions): an (N x M) array of member forces
+    and an (N x 3) array of the "roller", "fixedX" and "fixedY"
+    reactions. Variants whose equations are singular come back as NaN.
+    Raises np.linalg.LinAlgError if the topology does not give as many
+    equations as unknowns (2J = M + 3).
+"""
+def analyzeVariants(coords, memberJoints, fixedJoint, rollerJoint, loads, rollerAngle=90, chunkSize=256):
+    coords = np.asarray(coords, dtype=float)
+    memberJoints = np.asarray(memberJoints, dtype=int).reshape(-1, 2)
+    numVariants, numJoints = coords.shape[:2]
+    numMembers = len(memberJoints)
+    size = 2*numJoints
+    if size != numMembers + 3:
+        raise np.linalg.LinAlgError("Matrix is not square (%d x %d)" % (size, numMembers + 3))
+
+    loads = np.asarray(loads, dtype=float)
+    b = -np.broadcast_to(loads.reshape(-1, size), (numVariants, size))
+
+    start = memberJoints[:,0]
+    end = memberJoints[:,1]
+    col = np.arange(numMembers)
+
+    x = np.empty((numVariants, size))
+    for first in range(0, numVariants, chunkSize):
+        last = min(first + chunkSize, numVariants)
+        chunk = coords[first:last]
+
+        # Direction cosines of every member of every variant in the chunk, (n x M)
+        d = chunk[:,end] - chunk[:,start]
+        length = np.hypot(d[:,:,0], d[:,:,1])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Zero length members give NaN coefficients, and a NaN solution for their variant
+            cos = d[:,:,0] / length
+            sin = d[:,:,1] / length
+
+        a = np.zeros((last - first, size, size))
+        a[:,2*start,col] = cos
+        a[:,2*start+1,col] = sin
+        a[:,2*end,col] = -cos
+        a[:,2*end+1,col] = -sin
+        a[:,2*rollerJoint,numMembers] = np.cos(np.radians(rollerAngle))
+        a[:,2*rollerJoint+1,numMembers] = np.sin(np.radians(rollerAngle))
+        a[:,2*fixedJoint,numMembers+1] = 1.0
+        a[:,2*fixedJoint+1,numMembers+2] = 1.0
+
+        try:
+            x[first:last] = np.linalg.solve(a, b[first:last,:,np.newaxis])[:,:,0]
+        except np.linalg.LinAlgError:
+            # At least one variant is a mechanism, solve them one at a time to find out which
+            for i in range(last - first):
+                try:
+                    x[first + i] = np.linalg.solve(a[i], b[first + i])
+                except np.linalg.LinAlgError:
+                    x[first + i] = np.nan
+
+    return x[:,:numMembers], x[:,numMembers:]
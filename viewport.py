@@ -0,0 +1,110 @@
+# Zooming and Panning the DesignSpace
+import math
+from constants import *
+
+class Viewport(object):
+    """
+    Maps truss coordinates to canvas coordinates for a view of the DesignSpace that can be
+    zoomed and panned.
+
+    Positions in between are given in view coordinates, the canvas coordinates of the default
+    view: truss point (x,y) is at (x, flipY-y), with flipY the height of the canvas, as it was
+    before the view could move. The current view is its scale, in pixels per truss unit, and
+    the point (left,top) in view coordinates that is at the top left corner of the canvas. The
+    grid and snapping work in view coordinates, so joints snap to the same points at any zoom.
+
+    The graphics cull themselves against the view, see isVisible, and keep the set of those that
+    currently have canvas items in liveGraphics. Below LABEL_MIN_ZOOM and ARROW_MIN_ZOOM they
+    also leave out their labels and arrowheads.
+    """
+    def __init__(self, width, height):
+        self.width = width      # Size of the canvas in pixels
+        self.height = height
+        self.flipY = height
+        self.scale = 1.0
+        self.left = 0.0
+        self.top = 0.0
+        self.version = 0        # Goes up every time the view moves
+        self.liveGraphics = set()
+
+    def toCanvas(self, x, y):
+        """ Canvas coordinates of the truss point (x,y) """
+        return (x - self.left)*self.scale, (self.flipY - y - self.top)*self.scale
+
+    def toTruss(self, cx, cy):
+        """ Truss coordinates of the canvas point (cx,cy) """
+        return cx/self.scale + self.left, self.flipY - (cy/self.scale + self.top)
+
+    def snap(self, cx, cy, spacing):
+        """ Moves the canvas point (cx,cy) to the nearest point of a grid with the given spacing """
+        vx = math.floor((cx/self.scale + self.left) / spacing + 0.5) * spacing
+        vy = math.floor((cy/self.scale + self.top) / spacing + 0.5) * spacing
+        return (vx - self.left)*self.scale, (vy - self.top)*self.scale
+
+    def getViewRegion(self):
+        """ Returns (left,top,right,bottom), the part of the default view that is on the canvas """
+        return self.left, self.top, self.left + self.width/self.scale, self.top + self.height/self.scale
+
+    def getRegion(self, margin=0):
+        """ Returns (x1,y1,x2,y2), the truss coordinates on the canvas and within margin pixels of it """
+        x1, y2 = self.toTruss(-margin, -margin)
+        x2, y1 = self.toTruss(self.width + margin, self.height + margin)
+        return x1, y1, x2, y2
+
+    def isVisible(self, x1, y1, x2, y2):
+        """ True if the canvas box with corners (x1,y1) and (x2,y2) is within VIEW_MARGIN pixels
+            of the canvas """
+        return max(x1, x2) >= -VIEW_MARGIN and min(x1, x2) <= self.width + VIEW_MARGIN and \
+               max(y1, y2) >= -VIEW_MARGIN and min(y1, y2) <= self.height + VIEW_MARGIN
+
+    def showLabels(self):
+        return self.scale >= LABEL_MIN_ZOOM
+
+    def showArrows(self):
+        return self.scale >= ARROW_MIN_ZOOM
+
+    def getLive(self, kind):
+        """ Returns a list of the live graphics of a class """
+        return [graphic for graphic in self.liveGraphics if isinstance(graphic, kind)]
+
+    def zoom(self, factor, cx, cy):
+        """ Zooms in by factor, keeping the canvas point (cx,cy) where it is. Returns whether the
+            scale changed, it is kept between MIN_ZOOM and MAX_ZOOM. """
+        scale = min(max(self.scale*factor, MIN_ZOOM), MAX_ZOOM)
+        if scale == self.scale:
+            return False
+        self.left += cx/self.scale - cx/scale
+        self.top += cy/self.scale - cy/scale
+        self.scale = scale
+        self.version += 1
+        return True
+
+    def pan(self, dx, dy):
+        """ Moves the view so that everything on the canvas moves by (dx,dy) pixels """
+        self.left -= dx/self.scale
+        self.top -= dy/self.scale
+        self.version += 1
+
+    def fit(self, x1, y1, x2, y2, padding=FIT_PADDING):
+        """ Zooms and pans so that the truss coordinates from (x1,y1) to (x2,y2) fill the canvas """
+        width = max(self.width - 2*padding, 1)
+        height = max(self.height - 2*padding, 1)
+        scale = min(width/max(x2 - x1, 1e-9), height/max(y2 - y1, 1e-9))
+        self.scale = min(max(scale, MIN_ZOOM), MAX_ZOOM)
+
+        centerX, centerY = (x1 + x2)/2, self.flipY - (y1 + y2)/2
+        self.left = centerX - self.width/(2*self.scale)
+        self.top = centerY - self.height/(2*self.scale)
+        self.version += 1
+
+    def reset(self):
+        """ Goes back to the default view """
+        self.scale = 1.0
+        self.left = 0.0
+        self.top = 0.0
+        self.version += 1
+
+    def resize(self, width, height):
+        self.width = width
+        self.height = height
+        self.version += 1